@@ -0,0 +1,53 @@
+"""
+Бенчмарки Yatube.
+
+Каждый модуль запускается из корня репозитория, например::
+
+    python -m benchmarks.indexes --posts 1000000
+
+Данные создаются в отдельной тестовой базе, рабочая база не трогается.
+"""
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'yatube'
+)
+
+
+def setup(db_path=None, keepdb=False):
+    """
+    Настраивает Django и создаёт тестовую базу.
+
+    db_path — файл SQLite для базы (по умолчанию база в памяти);
+    с keepdb существующая база и данные в ней переиспользуются.
+    """
+    if PROJECT_DIR not in sys.path:
+        sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('ALLOWED_HOSTS', '*')
+
+    import django
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    if db_path:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = db_path
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+
+
+def median_time(func, repeat=5):
+    """Медианное время выполнения func в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,132 @@
+"""
+Сколько байт картинок получает клиент за одну страницу index.
+
+До: одно превью 960x339 JPEG с качеством sorl-thumbnail по умолчанию
+(95) для всех клиентов. После: копия из srcset, которую выберет
+браузер по ширине экрана и плотности пикселей; для браузеров без WebP
+— из запасного JPEG.
+
+    python -m benchmarks.images --posts 10
+"""
+import argparse
+import random
+import re
+import shutil
+import tempfile
+from io import BytesIO
+
+from benchmarks import setup
+
+# ширина окна в CSS-пикселях и плотность пикселей экрана
+CLIENTS = (
+    ('телефон 360px, 2x', 360, 2),
+    ('телефон 360px, 3x', 360, 3),
+    ('планшет 768px, 1x', 768, 1),
+    ('ноутбук 1280px, 1x', 1280, 1),
+    ('ноутбук 1440px, 2x', 1440, 2),
+)
+
+SOURCE_RE = re.compile(r'<source type="image/webp" srcset="([^"]+)"')
+IMG_RE = re.compile(r'<img class="card-img"[^>]* srcset="([^"]+)"')
+
+
+def photo(rng, width=1600, height=1200):
+    """Картинка, которая сжимается примерно как фотография."""
+    from PIL import Image
+
+    noise = Image.effect_noise((width, height), rng.randint(20, 60))
+    gradient = Image.linear_gradient('L').resize((width, height))
+    channels = [
+        Image.blend(noise, gradient.rotate(angle), 0.7)
+        for angle in rng.sample((0, 90, 180, 270), 3)
+    ]
+    picture = BytesIO()
+    Image.merge('RGB', channels).save(picture, 'JPEG', quality=90)
+    return picture.getvalue()
+
+
+def card_jpeg(content):
+    """Превью карточки так, как его делал sorl-thumbnail."""
+    from PIL import Image, ImageOps
+    from posts.thumbnails import CARD_HEIGHT, CARD_WIDTH
+
+    image = Image.open(BytesIO(content)).convert('RGB')
+    frame = ImageOps.fit(image, (CARD_WIDTH, CARD_HEIGHT), Image.LANCZOS)
+    buffer = BytesIO()
+    frame.save(buffer, 'JPEG', quality=95)
+    return buffer.tell()
+
+
+def parse_srcset(srcset):
+    candidates = []
+    for item in srcset.split(', '):
+        url, width = item.rsplit(' ', 1)
+        candidates.append((int(width[:-1]), url))
+    return sorted(candidates)
+
+
+def choose(candidates, viewport, density):
+    """Копия, которую возьмёт браузер при sizes карточки."""
+    from posts.thumbnails import CARD_WIDTH
+
+    needed = min(viewport, CARD_WIDTH) * density
+    for width, url in candidates:
+        if width >= needed:
+            return url
+    return candidates[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+    from django.test import Client
+    from posts import thumbnails
+    from posts.models import Post, User
+
+    media = tempfile.mkdtemp()
+    settings.MEDIA_ROOT = default_storage.location = media
+    try:
+        rng = random.Random(args.seed)
+        author = User.objects.create(username='photographer')
+        before = 0
+        for number in range(args.posts):
+            content = photo(rng)
+            before += card_jpeg(content)
+            post = Post(text=f'Пост {number}', author=author)
+            post.image.save(f'photo{number}.jpg', ContentFile(content))
+            thumbnails.generate(post.pk)
+
+        cache.clear()
+        html = Client().get('/').content.decode()
+        webp = [parse_srcset(srcset) for srcset in SOURCE_RE.findall(html)]
+        jpeg = [parse_srcset(srcset) for srcset in IMG_RE.findall(html)]
+        prefix = settings.MEDIA_URL
+
+        def page_bytes(cards, viewport, density):
+            return sum(
+                default_storage.size(
+                    choose(candidates, viewport, density)[len(prefix):]
+                )
+                for candidates in cards
+            )
+
+        print(f'Карточек на странице: {len(jpeg)}')
+        print(f'{"клиент":<22}{"до, КБ":>10}{"WebP, КБ":>12}{"JPEG, КБ":>12}')
+        for name, viewport, density in CLIENTS:
+            print(f'{name:<22}{before / 1024:>10.1f}'
+                  f'{page_bytes(webp, viewport, density) / 1024:>12.1f}'
+                  f'{page_bytes(jpeg, viewport, density) / 1024:>12.1f}')
+    finally:
+        shutil.rmtree(media, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Планы и время выполнения горячих запросов без составных индексов
+миграции 0010_indexes и с ними. Уникальность подписок (unique_follow)
+не снимается: в SQLite она живёт в определении таблицы.
+
+    python -m benchmarks.indexes --posts 1000000 --db /tmp/bench.sqlite3
+"""
+import argparse
+
+from benchmarks import median_time, setup
+
+
+def queries():
+    from posts.models import Comment, Follow, Post
+    from posts.paginator import CursorPaginator
+
+    post = Post.objects.order_by('id')[Post.objects.count() // 2]
+    posts = CursorPaginator(Post.objects.for_list(), 10)
+    group = CursorPaginator(
+        Post.objects.for_list().filter(group_id=post.group_id), 10
+    )
+    author = CursorPaginator(
+        Post.objects.for_list().filter(author_id=post.author_id), 10
+    )
+    follow = Follow.objects.first()
+    return {
+        'index, первая страница': posts.object_list[:11],
+        'index, глубокая страница': posts._before(post.pub_date, post.pk)[:11],
+        'group_posts': group.object_list[:11],
+        'profile': author.object_list[:11],
+        'profile, глубокая страница': author._before(
+            post.pub_date, post.pk
+        )[:11],
+        'подписка': Follow.objects.filter(
+            user_id=follow.user_id, author_id=follow.author_id
+        ),
+        'комментарии поста': Comment.objects.filter(post=post),
+    }
+
+
+def measure(repeat):
+    results = {}
+    for name, queryset in queries().items():
+        results[name] = (
+            median_time(lambda: list(queryset.all()), repeat),
+            queryset.explain(),
+        )
+    return results
+
+
+def drop_indexes(editor, models):
+    for model in models:
+        for index in model._meta.indexes:
+            editor.remove_index(model, index)
+
+
+def create_indexes(editor, models):
+    for model in models:
+        for index in model._meta.indexes:
+            editor.add_index(model, index)
+
+
+def indent(plan):
+    return plan.replace('\n', '\n' + ' ' * 17)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', help='файл SQLite для тестовой базы')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='использовать уже заполненную базу')
+    args = parser.parse_args()
+
+    setup(args.db, args.keepdb)
+    from benchmarks.seed import seed
+    from django.db import connection
+    from posts.models import Comment, Post
+
+    if not Post.objects.exists():
+        # ленты в запросах бенчмарка не участвуют
+        seed(users=args.users, posts=args.posts, comments=args.comments,
+             feeds=False)
+
+    models = (Post, Comment)
+    with connection.schema_editor() as editor:
+        drop_indexes(editor, models)
+    before = measure(args.repeat)
+    with connection.schema_editor() as editor:
+        create_indexes(editor, models)
+    after = measure(args.repeat)
+
+    for name in before:
+        (time_before, plan_before), (time_after, plan_after) = (
+            before[name], after[name]
+        )
+        print(f'== {name}: {time_before * 1000:.2f} ms -> '
+              f'{time_after * 1000:.2f} ms')
+        print(f'   без индексов: {indent(plan_before)}')
+        print(f'   с индексами:  {indent(plan_after)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""
+Нагрузочный бенчмарк основных страниц и форм.
+
+Сценарии index, group_posts, profile, post_view, follow_index,
+add_comment и new_post по очереди выполняются --requests раз со
+случайными группами, авторами, постами и читателями из заполненной
+базы (benchmarks.seed). Для каждого сценария выводятся задержки
+p50/p95/p99, среднее число SQL-запросов на запрос и пропускная
+способность. Запросы идут через тестовый клиент Django в этом же
+потоке (--client test) или по HTTP к локальному WSGI-серверу
+в --concurrency потоков (--client wsgi; число запросов к базе сервер сообщает
+в Server-Timing, см. posts.profiling). Ответы с кодом 400 и больше
+в задержки не входят и считаются ошибками; на SQLite параллельные
+add_comment и new_post частью падают с «database is locked».
+
+Результаты сохраняются в JSON (--output) и сравниваются с прошлым
+прогоном (--compare): ухудшение задержек больше --threshold или рост
+числа запросов отмечается и даёт код выхода 1.
+
+    python -m benchmarks.load --requests 200 --output before.json
+    python -m benchmarks.load --requests 200 --compare before.json
+    python -m benchmarks.load --db /tmp/bench.sqlite3 --keepdb \\
+        --client wsgi --concurrency 4
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks import seed, setup
+
+SCENARIOS = ('index', 'group_posts', 'profile', 'post_view',
+             'follow_index', 'add_comment', 'new_post')
+
+PERCENTILES = (50, 95, 99)
+
+# сколько постов и читателей выбирается из базы для запросов
+POOL = 1000
+READERS = 20
+
+SQL_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) SQL"')
+
+
+class Data:
+    """Случайная выборка групп, авторов, постов и читателей из базы."""
+
+    def __init__(self, rng):
+        from django.db.models import Max, Min
+        from posts.models import Follow, Group, Post, User
+
+        self.rng = rng
+        self.groups = list(Group.objects.values_list('pk', 'slug'))
+        bounds = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        ids = [rng.randint(bounds['first'], bounds['last'])
+               for _ in range(POOL)]
+        self.posts = list(Post.objects.filter(pk__in=ids).values_list(
+            'pk', 'author__username'
+        ))
+        readers = Follow.objects.values_list('user_id', flat=True)
+        self.readers = list(User.objects.filter(
+            pk__in=list(readers.distinct()[:READERS])
+        ))
+
+    def request(self, scenario):
+        """Запрос сценария: (метод, путь, данные формы, пользователь)."""
+        from django.urls import reverse
+
+        rng = self.rng
+        post_id, author = rng.choice(self.posts)
+        reader = rng.choice(self.readers)
+        group_id, slug = rng.choice(self.groups)
+        words = seed.text(rng, 20)
+        return {
+            'index': ('GET', reverse('index'), None, None),
+            'group_posts': ('GET', reverse('group_posts', args=[slug]),
+                            None, None),
+            'profile': ('GET', reverse('profile', args=[author]), None, None),
+            'post_view': ('GET', reverse('post', args=[author, post_id]),
+                          None, None),
+            'follow_index': ('GET', reverse('follow_index'), None, reader),
+            'add_comment': ('POST', reverse('add_comment',
+                                            args=[author, post_id]),
+                            {'text': words}, reader),
+            'new_post': ('POST', reverse('new_post'),
+                         {'text': words, 'group': group_id}, reader),
+        }[scenario]
+
+
+class TestClientDriver:
+    """Запросы через django.test.Client в текущем потоке."""
+
+    concurrency = 1
+
+    def __init__(self, readers):
+        from django.test import Client
+
+        self.anonymous = Client()
+        self.clients = {}
+        for user in readers:
+            self.clients[user.pk] = Client()
+            self.clients[user.pk].force_login(user)
+
+    def __call__(self, method, path, data, user):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        client = self.clients[user.pk] if user else self.anonymous
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'POST':
+                response = client.post(path, data)
+            else:
+                response = client.get(path)
+        return response.status_code, len(queries)
+
+    def close(self):
+        pass
+
+
+class WSGIDriver:
+    """Запросы по HTTP к WSGI-серверу проекта в отдельном потоке."""
+
+    def __init__(self, readers, concurrency):
+        from django.conf import settings
+        from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                                  WSGIRequestHandler)
+        from django.core.wsgi import get_wsgi_application
+        from django.test import Client
+        from django.urls import reverse
+
+        self.concurrency = concurrency
+        # число запросов к базе сервер сообщает в Server-Timing
+        settings.PROFILING_SAMPLE_RATE = 1
+        application = get_wsgi_application()
+        # get_wsgi_application() заново настраивает логи
+        logging.getLogger('posts.profiling').handlers = [
+            logging.NullHandler()
+        ]
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(application)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        # сессия и CSRF-токен читателя берутся у тестового клиента:
+        # база и настройки у него те же, что у сервера
+        self.headers = {None: {}}
+        for user in readers:
+            client = Client()
+            client.force_login(user)
+            client.get(reverse('new_post'))
+            token = client.cookies['csrftoken'].value
+            self.headers[user.pk] = {
+                'Cookie': f'sessionid={client.cookies["sessionid"].value}; '
+                          f'csrftoken={token}',
+                'X-CSRFToken': token,
+            }
+
+    def __call__(self, method, path, data, user):
+        from urllib.parse import urlencode
+
+        headers = dict(self.headers[user.pk if user else None])
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        match = SQL_RE.search(response.getheader('Server-Timing', ''))
+        return response.status, int(match.group(1)) if match else 0
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def run_scenario(driver, data, scenario, count, warmup, cold):
+    from django.core.cache import cache
+
+    def one(request):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        try:
+            status, queries = driver(*request)
+        except (OSError, http.client.HTTPException):
+            return None
+        return time.perf_counter() - start, status, queries
+
+    for _ in range(warmup):
+        one(data.request(scenario))
+    # запросы выбираются заранее: rng не делится между потоками
+    requests = [data.request(scenario) for _ in range(count)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=driver.concurrency) as executor:
+        results = list(executor.map(one, requests))
+    elapsed = time.perf_counter() - start
+
+    done = [result for result in results
+            if result is not None and result[1] < 400]
+    latencies = [result[0] for result in done] or [0]
+    result = {f'p{percent}_ms': percentile(latencies, percent) * 1000
+              for percent in PERCENTILES}
+    result.update({
+        'queries': sum(result[2] for result in done) / max(len(done), 1),
+        'rps': count / elapsed,
+        'requests': count,
+        'errors': count - len(done),
+    })
+    return {key: round(value, 3) if isinstance(value, float) else value
+            for key, value in result.items()}
+
+
+def print_results(results):
+    columns = [f'p{percent}, ms' for percent in PERCENTILES]
+    columns += ['SQL/запрос', 'запросов/с', 'ошибок']
+    print(f'{"":<14}' + ''.join(f'{column:>12}' for column in columns))
+    for scenario, result in results.items():
+        cells = [result[f'p{percent}_ms'] for percent in PERCENTILES]
+        cells += [result['queries'], result['rps']]
+        print(f'{scenario:<14}'
+              + ''.join(f'{cell:>12.2f}' for cell in cells)
+              + f'{result["errors"]:>12}')
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает с прошлым прогоном; возвращает число ухудшений."""
+    regressions = 0
+    keys = [f'p{percent}_ms' for percent in PERCENTILES] + ['queries']
+    print(f'\nСравнение с {baseline["date"]} ({baseline["commit"]}):')
+    print(f'{"":<14}' + ''.join(f'{key:>22}' for key in keys))
+    for scenario, result in results.items():
+        before = baseline['results'].get(scenario)
+        if before is None:
+            continue
+        cells = []
+        for key in keys:
+            old, new = before[key], result[key]
+            change = (new - old) / old if old else 0
+            worse = (new > old if key == 'queries'
+                     else change > threshold)
+            regressions += worse
+            mark = ' !' if worse else '  '
+            cells.append(f'{old:.2f} -> {new:.2f} {change:+.0%}{mark}')
+        print(f'{scenario:<14}' + ''.join(f'{cell:>22}' for cell in cells))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], check=True,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--db', help='файл SQLite для тестовой базы')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='использовать уже заполненную базу')
+    seed.add_arguments(parser)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        default=SCENARIOS)
+    parser.add_argument('--requests', type=int, default=200,
+                        help='запросов на сценарий')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--client', choices=('test', 'wsgi'), default='test')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='потоков клиента для --client wsgi')
+    parser.add_argument('--cold', action='store_true',
+                        help='очищать кеш перед каждым запросом')
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='допустимое ухудшение задержек, доля')
+    args = parser.parse_args()
+
+    if args.client == 'wsgi' and not args.db:
+        # потоки сервера открывают свои соединения с базой
+        args.db = tempfile.mkstemp(suffix='.sqlite3')[1]
+    setup(args.db, args.keepdb)
+    from posts.models import Post
+
+    if not Post.objects.exists():
+        seed.run(args)
+    data = Data(random.Random(args.seed))
+    if args.client == 'wsgi':
+        driver = WSGIDriver(data.readers, args.concurrency)
+    else:
+        driver = TestClientDriver(data.readers)
+    try:
+        results = {
+            scenario: run_scenario(driver, data, scenario, args.requests,
+                                   args.warmup, args.cold)
+            for scenario in args.scenarios
+        }
+    finally:
+        driver.close()
+
+    print_results(results)
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'compare')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
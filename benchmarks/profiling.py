@@ -0,0 +1,129 @@
+"""
+Накладные расходы профилирования запросов (posts.profiling).
+
+Время запроса к index через тестовый клиент со стандартным бэкендом
+шаблонов без профилирования и с PROFILING_SAMPLE_RATE 0, 0.01 и 1;
+страница берётся из кеша страниц или отрисовывается заново (кеш
+очищен). Разница в доли процента тонет в шуме измерения, поэтому
+ожидаемые расходы при доле r считаются и из составляющих: проход
+запроса вне выборки через middleware и точку замера (микробенчмарк)
+плюс r × цена профилируемого запроса. Записи лога отбрасываются,
+их создание в замер входит.
+
+    python -m benchmarks.profiling --repeat 300 --rounds 7
+"""
+import argparse
+import logging
+import time
+
+from benchmarks import setup
+from benchmarks.templates import create_data
+
+STOCK_BACKEND = 'django.template.backends.django.DjangoTemplates'
+
+RATES = (0, 0.01, 1)
+
+
+def modes(templates):
+    stock = [dict(templates[0], BACKEND=STOCK_BACKEND)]
+    variants = {'без профилирования': {'TEMPLATES': stock,
+                                       'PROFILING_SAMPLE_RATE': 0}}
+    for rate in RATES:
+        variants[f'доля {rate}'] = {'PROFILING_SAMPLE_RATE': rate}
+    return variants
+
+
+def loop_time(func, repeat):
+    """Среднее время вызова func в цикле из repeat вызовов."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def unsampled_costs(repeat):
+    """
+    Цена запроса вне выборки: проход через ProfilingMiddleware
+    и одна точка замера (timed) без текущего профиля.
+    """
+    from django.http import HttpResponse
+    from django.test import override_settings
+    from posts import profiling
+
+    response = HttpResponse()
+
+    def view(request):
+        return response
+
+    with override_settings(PROFILING_SAMPLE_RATE=1e-12):
+        middleware = profiling.ProfilingMiddleware(view)
+    timed_view = profiling.timed('render')(view)
+    passes = {
+        'middleware': (lambda: middleware(None), lambda: view(None)),
+        'точка замера': (lambda: timed_view(None), lambda: view(None)),
+    }
+    return {
+        name: min(loop_time(func, repeat) for _ in range(5))
+        - min(loop_time(base, repeat) for _ in range(5))
+        for name, (func, base) in passes.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=7)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+
+    logging.getLogger('posts.profiling').handlers = [logging.NullHandler()]
+    create_data(10)
+    cases = {
+        'index, из кеша': lambda client: client.get('/'),
+        'index, отрисовка': lambda client: (cache.clear(), client.get('/')),
+    }
+    variants = modes(settings.TEMPLATES)
+    results = {case: {mode: [] for mode in variants} for case in cases}
+    # варианты чередуются; как в timeit, итог — лучшее среднее из раундов
+    for _ in range(args.rounds):
+        for mode, overrides in variants.items():
+            with override_settings(**overrides):
+                client = Client()
+                for case, run in cases.items():
+                    run(client)
+                    results[case][mode].append(
+                        loop_time(lambda: run(client), args.repeat)
+                    )
+    best = {case: {mode: min(timings) for mode, timings in values.items()}
+            for case, values in results.items()}
+
+    print(f'{"":<20}' + ''.join(f'{mode:>22}' for mode in variants))
+    for case, timings in best.items():
+        base = timings['без профилирования']
+        print(f'{case:<20}' + ''.join(
+            f'{f"{elapsed * 1000:.3f} ms {(elapsed - base) / base:+.1%}":>22}'
+            for elapsed in timings.values()
+        ))
+
+    costs = unsampled_costs(args.repeat * 100)
+    print()
+    for name, cost in costs.items():
+        print(f'вне выборки, {name}: {cost * 1e6:.2f} µs')
+    # точки замера за запрос: отрисовка шаблона и поиск превью
+    unsampled = costs['middleware'] + 2 * costs['точка замера']
+    for case, timings in best.items():
+        base = timings['без профилирования']
+        sampled = max(timings['доля 1'] - timings['доля 0'], 0)
+        print(f'{case}: профилируемый запрос +{sampled * 1e6:.0f} µs; '
+              'ожидаемо ' + ', '.join(
+                  f'{(unsampled + rate * sampled) / base:.2%} при доле {rate}'
+                  for rate in (0.001, 0.01, 0.1)
+              ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Время отрисовки страницы index без кеша страниц: посты без картинок
+и посты с картинками, копии которых ещё не готовы. Для длинных постов
+и страницы поста с длинными комментариями — с готовым HTML текста
+(text_html) и с построением HTML при отрисовке, как было до его
+хранения.
+
+    python -m benchmarks.render --repeat 50
+"""
+import argparse
+import inspect
+from unittest import mock
+
+from benchmarks import median_time, setup
+
+
+LONG_TEXT = ('Строка длинного поста с <разметкой> & символами. ' * 15
+             + '#тег @benchmark\n') * 20
+
+
+def render_index():
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.cache import cache
+    from django.test import RequestFactory
+    from posts.views import index
+
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    view = inspect.unwrap(index)
+
+    def run(cold):
+        if cold:
+            cache.clear()
+        view(request)
+    return run
+
+
+def render_post(comments):
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from posts import rendering
+    from posts.models import Comment, Post
+    from posts.views import post_view
+
+    post = Post.objects.first()
+    Comment.objects.bulk_create(
+        Comment(post=post, author=post.author, text=LONG_TEXT)
+        for _ in range(comments)
+    )
+    # bulk_create обходит сигналы: HTML строится так же, как при save()
+    saved = list(Comment.objects.filter(post=post))
+    for comment in saved:
+        rendering.prepare(comment)
+    Comment.objects.bulk_update(saved, ['text_html', 'text_html_version'])
+    request = RequestFactory().get('/')
+    request.user = AnonymousUser()
+    view = inspect.unwrap(post_view)
+
+    def run(cold):
+        view(request, post.author.username, post.pk)
+    return run
+
+
+def create_posts(count, with_images, text='Пост {number}'):
+    from posts.models import Post, User
+
+    author, _ = User.objects.get_or_create(username='benchmark')
+    Post.objects.all().delete()
+    for number in range(count):
+        post = Post.objects.create(
+            text=text.format(number=number), author=author
+        )
+        if with_images:
+            post.image.name = f'posts/photo{number}.jpg'
+            post.save()
+
+
+def measure(run, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    results = {}
+    for cold in (False, True):
+        run(cold)
+        with CaptureQueriesContext(connection) as queries:
+            run(cold)
+        results[cold] = (
+            median_time(lambda: run(cold), repeat), len(queries)
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from posts import rendering
+
+    run = render_index()
+    cases = {}
+    create_posts(10, with_images=False)
+    cases['без картинок'] = measure(run, args.repeat)
+    create_posts(10, with_images=True)
+    cases['картинки без копий'] = measure(run, args.repeat)
+
+    create_posts(10, with_images=False, text=LONG_TEXT)
+    cases['длинные, text_html'] = measure(run, args.repeat)
+    # версия, которой нет ни у одной записи: HTML строится при отрисовке
+    with mock.patch.object(rendering, 'VERSION', -1):
+        cases['длинные, на лету'] = measure(run, args.repeat)
+    run = render_post(comments=50)
+    cases['пост, 50 комм., text_html'] = measure(run, args.repeat)
+    with mock.patch.object(rendering, 'VERSION', -1):
+        cases['пост, 50 комм., на лету'] = measure(run, args.repeat)
+
+    print(f'{"":<28}{"тёплый кеш":>20}{"пустой кеш":>20}')
+    for name, results in cases.items():
+        cells = ''.join(
+            f'{f"{elapsed * 1000:.2f} ms, {queries} SQL":>20}'
+            for elapsed, queries in (results[False], results[True])
+        )
+        print(f'{name:<28}{cells}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Генератор синтетических данных для бенчмарков.
+
+Данные создаются пачками через bulk_create, поэтому миллионы строк
+заполняются за минуты; то, что при обычном сохранении делают сигналы
+(HTML текста, ленты подписок, счётчики), заполняется здесь же разом.
+Одинаковый random_seed даёт одинаковые данные.
+
+Заполнить базу один раз и переиспользовать её в других бенчмарках::
+
+    python -m benchmarks.seed --db /tmp/bench.sqlite3 --posts 1000000
+    python -m benchmarks.load --db /tmp/bench.sqlite3 --keepdb
+"""
+import argparse
+import json
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.db.models import Max, Min
+from django.utils import timezone
+
+WORDS = (
+    'пост', 'футбол', 'город', 'новости', 'погода', 'кот', 'музыка',
+    'путешествие', 'книга', 'кино', 'работа', 'лето', 'море', 'код',
+    'друзья', 'утро', 'вечер', 'фото', 'рецепт', 'спорт',
+)
+
+
+def bulk_create(model, objs, batch_size):
+    """bulk_create частями, чтобы не держать в памяти все объекты."""
+    objs = iter(objs)
+    while True:
+        batch = list(islice(objs, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def text(rng, words=30):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def prepared(obj):
+    """Запись с готовым HTML текста, как после save()."""
+    from posts import rendering
+
+    rendering.prepare(obj)
+    return obj
+
+
+def follow_pairs(rng, user_ids, follows, skew):
+    """
+    Подписки (user_id, author_id). Число подписок пользователя
+    распределено экспоненциально со средним follows, популярность
+    авторов — по закону Ципфа с показателем skew (0 — все одинаково
+    популярны): у немногих авторов тысячи подписчиков, у большинства
+    единицы.
+    """
+    authors = list(user_ids)
+    rng.shuffle(authors)
+    weights = list(accumulate(
+        1 / (rank + 1) ** skew for rank in range(len(authors))
+    ))
+    pairs = set()
+    for user_id in user_ids:
+        degree = min(round(rng.expovariate(1 / follows)) if follows else 0,
+                     len(authors) - 1)
+        for author_id in rng.choices(authors, cum_weights=weights, k=degree):
+            if author_id != user_id:
+                pairs.add((user_id, author_id))
+    return pairs
+
+
+def seed_images(rng, count, size=(1200, 900)):
+    """
+    Картинки для постов: [(имя файла, копии в JSON)]. Картинок немного,
+    посты делят их между собой, как одинаковые загрузки в хранилище
+    с адресацией по содержимому; копии создаются один раз.
+    """
+    from django.core.files.base import ContentFile
+    from posts import thumbnails
+    from posts.models import Post
+    from posts.storage import image_storage
+
+    from benchmarks.images import photo
+
+    images = []
+    for number in range(count):
+        name = image_storage.save(
+            f'posts/seed{number}.jpg', ContentFile(photo(rng, *size))
+        )
+        post = Post(image=name)
+        derivatives = thumbnails.make_derivatives(post.image)
+        images.append((name, json.dumps(derivatives)))
+    return images
+
+
+def seed(users=1000, groups=20, posts=100000, comments=100000,
+         follows=10, follow_skew=1.0, images=0.0, image_pool=20,
+         feeds=True, batch_size=5000, random_seed=0):
+    """
+    Создаёт пользователей, группы, посты, комментарии и подписки
+    пачками через bulk_create, заполняет ленты и пересчитывает счётчики.
+
+    follows — среднее число подписок пользователя, follow_skew — перекос
+    популярности авторов (см. follow_pairs); images — доля постов
+    с картинкой из image_pool разных картинок; без feeds ленты подписок
+    (по строке на пост и подписчика автора) не заполняются.
+    """
+    from posts import counters, feed
+    from posts.models import Comment, Follow, Group, Post, User
+    from posts.transfer import manual_dates
+
+    rng = random.Random(random_seed)
+    now = timezone.now()
+
+    bulk_create(
+        User,
+        (User(username=f'user{i}', password='!') for i in range(users)),
+        batch_size,
+    )
+    user_ids = list(User.objects.values_list('id', flat=True))
+    bulk_create(
+        Group,
+        (Group(title=f'Группа {i}', slug=f'group-{i}', description=text(rng))
+         for i in range(groups)),
+        batch_size,
+    )
+    group_ids = list(Group.objects.values_list('id', flat=True)) + [None]
+    pictures = seed_images(rng, image_pool) if images else []
+
+    def new_post(number):
+        post = Post(text=text(rng), author_id=rng.choice(user_ids),
+                    group_id=rng.choice(group_ids),
+                    pub_date=now - timedelta(seconds=posts - number))
+        if pictures and rng.random() < images:
+            post.image, post.image_derivatives = rng.choice(pictures)
+        return prepared(post)
+
+    with manual_dates(Post._meta.get_field('pub_date')):
+        bulk_create(Post, (new_post(i) for i in range(posts)), batch_size)
+    bounds = Post.objects.aggregate(first=Min('id'), last=Max('id'))
+
+    with manual_dates(Comment._meta.get_field('created')):
+        bulk_create(
+            Comment,
+            (prepared(Comment(
+                post_id=rng.randint(bounds['first'], bounds['last']),
+                author_id=rng.choice(user_ids), text=text(rng, 10),
+                created=now - timedelta(seconds=comments - i),
+            )) for i in range(comments if posts else 0)),
+            batch_size,
+        )
+
+    pairs = follow_pairs(rng, user_ids, follows, follow_skew)
+    bulk_create(
+        Follow,
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in sorted(pairs)),
+        batch_size,
+    )
+    if feeds:
+        feed.fill()
+    counters.recount()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', required=True, help='файл SQLite для базы')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    from benchmarks import setup
+
+    setup(args.db)
+    start = time.perf_counter()
+    media = run(args)
+    print(f'Заполнено за {time.perf_counter() - start:.1f} s')
+    if media:
+        print(f'Картинки: {media}')
+
+
+def add_arguments(parser):
+    """Параметры данных, общие для бенчмарков, которые заполняют базу."""
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--follows', type=float, default=10,
+                        help='среднее число подписок пользователя')
+    parser.add_argument('--follow-skew', type=float, default=1.0,
+                        help='показатель Ципфа популярности авторов')
+    parser.add_argument('--images', type=float, default=0.0,
+                        help='доля постов с картинкой')
+    parser.add_argument('--media', help='каталог для картинок')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def run(args):
+    """
+    Заполняет базу по параметрам add_arguments(), возвращает каталог
+    с картинками (None, если их нет).
+    """
+    media = use_media(args.media) if args.images else None
+    seed(users=args.users, groups=args.groups, posts=args.posts,
+         comments=args.comments, follows=args.follows,
+         follow_skew=args.follow_skew, images=args.images,
+         random_seed=args.seed)
+    return media
+
+
+def use_media(media=None):
+    """Картинки пишутся в media (по умолчанию во временный каталог)."""
+    import tempfile
+
+    from django.conf import settings
+    from posts.storage import image_storage
+
+    media = media or tempfile.mkdtemp(prefix='yatube-bench-')
+    settings.MEDIA_ROOT = image_storage.location = media
+    return media
+
+
+if __name__ == '__main__':
+    main()
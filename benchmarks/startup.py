@@ -0,0 +1,107 @@
+"""
+Холодный старт: время первых запросов к страницам в новом процессе
+с кешированным загрузчиком шаблонов без прогрева (TEMPLATES_WARMUP=0),
+с прогревом при запуске и с DEBUG, когда шаблоны разбираются при каждом
+выводе. Каждый вариант запускается в --runs новых процессах (медиана);
+«повторно» — те же запросы после первого, с очищенным кешем страниц.
+
+    python -m benchmarks.startup --runs 5 --repeat 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+
+from benchmarks import median_time, setup
+
+URLS = {
+    'index': '/',
+    'group': '/group/benchmark/',
+    'profile': '/benchmark/',
+    'post': '/benchmark/{post}/',
+    'login': '/auth/login/',
+}
+
+MODES = {
+    'без прогрева': {'TEMPLATES_WARMUP': '0'},
+    'с прогревом': {'TEMPLATES_WARMUP': '1'},
+    'DEBUG': {'DEBUG': '1'},
+}
+
+
+def child(repeat):
+    """Замеры в текущем процессе, результат — JSON в stdout."""
+    setup()
+    from django.core.cache import cache
+    from django.test import Client
+
+    from benchmarks.templates import create_data
+
+    author, _, _ = create_data(10)
+    post = author.posts.first()
+    client = Client()
+    first = {}
+    again = {}
+    for name, url in URLS.items():
+        url = url.format(post=post.pk)
+        start = time.perf_counter()
+        client.get(url)
+        first[name] = time.perf_counter() - start
+
+        def request():
+            cache.clear()
+            client.get(url)
+        again[name] = median_time(request, repeat)
+    print(json.dumps({'first': first, 'again': again}))
+
+
+def run_child(environ, repeat):
+    env = dict(os.environ, DEBUG='')
+    env.update(environ)
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child',
+         '--repeat', str(repeat)],
+        env=env, stdout=subprocess.PIPE, check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Сколько процессов запускается на вариант.')
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.repeat)
+        return
+
+    results = {}
+    for mode, environ in MODES.items():
+        runs = [run_child(environ, args.repeat) for _ in range(args.runs)]
+        results[mode] = {
+            kind: {name: median(run[kind][name] for run in runs)
+                   for name in URLS}
+            for kind in ('first', 'again')
+        }
+    print(f'{"первый запрос":<16}'
+          + ''.join(f'{mode:>16}' for mode in MODES) + f'{"повторно":>16}')
+    for name in URLS:
+        cells = [results[mode]['first'][name] for mode in MODES]
+        cells.append(results['с прогревом']['again'][name])
+        print(f'{name:<16}' + ''.join(f'{ms(value):>16}' for value in cells))
+    totals = [sum(results[mode]['first'].values()) for mode in MODES]
+    print(f'{"всего":<16}' + ''.join(f'{ms(value):>16}' for value in totals))
+
+
+def ms(seconds):
+    return f'{seconds * 1000:.2f} ms'
+
+
+if __name__ == '__main__':
+    main()
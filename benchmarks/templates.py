@@ -0,0 +1,90 @@
+"""
+Время отрисовки списков постов (index, group, profile, follow) без кеша
+страниц: карточки тегом {% post_cards %} (один get_many по кешу и
+скомпилированный шаблон карточки) и через includes/post_item.html
+для каждого поста, как было в шаблонах раньше (POST_CARDS_BATCHED=False).
+С тёплым кешем карточки уже закешированы, с пустым — рендерятся заново.
+
+    python -m benchmarks.templates --repeat 50
+"""
+import argparse
+import inspect
+
+from benchmarks import setup
+from benchmarks.render import LONG_TEXT, measure
+
+
+def create_data(count):
+    from posts.models import Follow, Group, Post, User
+
+    author = User.objects.create(username='benchmark')
+    reader = User.objects.create(username='reader')
+    group = Group.objects.create(
+        title='Бенчмарк', slug='benchmark', description='Группа бенчмарка'
+    )
+    # подписка до постов: посты раскладываются в ленту reader сигналами
+    Follow.objects.create(user=reader, author=author)
+    for number in range(count):
+        Post.objects.create(
+            text=f'Пост {number} #бенчмарк @reader\n' + LONG_TEXT[:500],
+            author=author, group=group,
+        )
+    return author, reader, group
+
+
+def pages(author, reader, group):
+    from django.test import RequestFactory
+    from posts.views import follow_index, group_posts, index, profile
+
+    request = RequestFactory().get('/')
+    request.user = reader
+    # unwrap снимает все декораторы: view без кеша страниц, ETag
+    # и проверки входа
+    index, group_posts, profile, follow_index = map(
+        inspect.unwrap, (index, group_posts, profile, follow_index)
+    )
+    return {
+        'index': lambda: index(request),
+        'group': lambda: group_posts(request, group.slug),
+        'profile': lambda: profile(request, author.username),
+        'follow': lambda: follow_index(request),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=30)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.cache import cache
+    from django.test import override_settings
+
+    views = pages(*create_data(args.posts))
+    modes = {'post_cards': True, 'include': False}
+    caches = {False: 'тёплый', True: 'пустой'}
+    columns = [(mode, cold) for cold in caches for mode in modes]
+    print(f'{"":<10}' + ''.join(
+        f'{mode + ", " + caches[cold]:>24}' for mode, cold in columns
+    ))
+    for name, view in views.items():
+        results = {}
+        for mode, batched in modes.items():
+            def run(cold):
+                if cold:
+                    cache.clear()
+                view()
+            with override_settings(POST_CARDS_BATCHED=batched):
+                results[mode] = measure(run, args.repeat)
+        cells = ''.join(
+            f'{f"{elapsed * 1000:.2f} ms, {queries} SQL":>24}'
+            for elapsed, queries in (
+                results[mode][cold] for mode, cold in columns
+            )
+        )
+        print(f'{name:<10}{cells}')
+
+
+if __name__ == '__main__':
+    main()
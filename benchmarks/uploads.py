@@ -0,0 +1,126 @@
+"""
+Пиковая память процесса при загрузке картинки через new_post
+и при создании её копий для srcset, для файлов разного размера.
+
+Каждый замер идёт в отдельном процессе; пик памяти (VmHWM) перед
+запросом сбрасывается через /proc/self/clear_refs, поэтому нужен Linux.
+Тело запроса собирается в памяти заранее и в прирост не входит.
+
+    python -m benchmarks.uploads --sizes 5 15 40
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from io import BytesIO
+
+
+def peak_rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+
+
+def rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+
+
+def reset_peak():
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+
+
+def photo(megabytes):
+    """JPEG размером около megabytes МБ: шум сжимается плохо."""
+    from PIL import Image
+
+    side = int((megabytes * 2 ** 20 / 0.93) ** 0.5)
+    picture = BytesIO()
+    Image.effect_noise((side * 4 // 3, side * 3 // 4), 60).convert(
+        'RGB'
+    ).save(picture, 'JPEG', quality=95)
+    return picture.getvalue()
+
+
+def measure(path, handlers):
+    from benchmarks import setup
+
+    setup()
+    from django.conf import settings
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.test import RequestFactory
+    from posts import thumbnails
+    from posts.models import Post, User
+    from posts.views import new_post
+
+    settings.MEDIA_ROOT = tempfile.mkdtemp()
+    view = new_post
+    if handlers == 'django':
+        # без posts.uploads.image_uploads: обработчики по умолчанию
+        view = new_post.__wrapped__
+    with open(path, 'rb') as source:
+        content = source.read()
+    request = RequestFactory().post('/new/', {
+        'text': 'Пост с картинкой',
+        'image': SimpleUploadedFile('photo.jpg', content, 'image/jpeg'),
+    })
+    request.user = User.objects.create(username='photographer')
+    request._dont_enforce_csrf_checks = True
+
+    reset_peak()
+    before = rss()
+    view(request)
+    upload = peak_rss() - before
+    post = Post.objects.first()
+    if post is None:
+        # файл больше POST_IMAGE_MAX_SIZE
+        return {'size': len(content), 'upload': upload, 'derivatives': None}
+    reset_peak()
+    before = rss()
+    thumbnails.generate(post.pk)
+    return {'size': len(content), 'upload': upload,
+            'derivatives': peak_rss() - before}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 15, 40])
+    parser.add_argument('--measure', nargs=2, help=argparse.SUPPRESS,
+                        metavar=('PATH', 'HANDLERS'))
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    print(f'{"файл, МБ":>10}{"обработчики":>14}'
+          f'{"загрузка, МБ":>16}{"копии, МБ":>12}')
+    for megabytes in args.sizes:
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as source:
+            source.write(photo(megabytes))
+            source.flush()
+            for handlers in ('django', 'yatube'):
+                print(run(source.name, handlers))
+
+
+def run(path, handlers):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.uploads',
+         '--measure', path, handlers],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    derivatives = result['derivatives']
+    derivatives = ('отклонён' if derivatives is None
+                   else f'{derivatives / 2 ** 20:.1f}')
+    return (f'{result["size"] / 2 ** 20:>10.1f}{handlers:>14}'
+            f'{result["upload"] / 2 ** 20:>16.1f}{derivatives:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -35,4 +35,5 @@ assert process.returncode == 0, f'Вы забыли сделать миграц
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_query_budget',
 ]
@@ -1,7 +1,9 @@
 import tempfile
+import time
 
 import pytest
 from mixer.backend.django import mixer as _mixer
+from posts import thumbnails
 from posts.models import Group, Post
 
 
@@ -10,6 +12,10 @@ def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
         settings.MEDIA_ROOT = temp_directory
         yield temp_directory
+        # копии картинок пишутся в фоне: ждём их, пока MEDIA_ROOT временный
+        deadline = time.monotonic() + 30
+        while thumbnails._pending and time.monotonic() < deadline:
+            time.sleep(0.05)
 
 
 @pytest.fixture
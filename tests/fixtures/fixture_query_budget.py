@@ -0,0 +1,19 @@
+import pytest
+
+from tests.query_budget import QueryBudgets
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-query-budgets', action='store_true',
+        help='Записать текущие запросы страниц в tests/query_budgets.json',
+    )
+
+
+@pytest.fixture(scope='session')
+def query_budgets(request):
+    budgets = QueryBudgets(
+        update=request.config.getoption('--update-query-budgets')
+    )
+    yield budgets
+    budgets.save()
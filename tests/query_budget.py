@@ -0,0 +1,104 @@
+"""
+Бюджеты SQL-запросов страниц.
+
+Страница запрашивается на маленьких и больших данных: число запросов
+не должно зависеть от числа постов и комментариев на странице и не
+должно превышать бюджет из query_budgets.json. В файле вместе с числом
+хранится и сам SQL (литералы заменены на ?), поэтому при превышении
+видно, какие запросы добавились. Обновить файл после намеренного
+изменения запросов:
+
+    pytest tests/test_query_budget.py --update-query-budgets
+"""
+import difflib
+import json
+import os
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_RE = re.compile(r'IN \(\?(?:, \?)*\)')
+# имена точек сохранения транзакций разные при каждом запуске
+SAVEPOINT_RE = re.compile(r'"s\d+_x\d+"')
+
+
+def normalize(sql):
+    """SQL без значений: строки и числа заменены на ?, списки IN свёрнуты."""
+    sql = STRING_RE.sub('?', sql)
+    sql = SAVEPOINT_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    return IN_RE.sub('IN (...)', sql)
+
+
+def capture(client, url):
+    """Запрашивает url с пустым кешем и возвращает выполненный SQL."""
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code < 400, (
+        f'Страница `{url}` ответила кодом {response.status_code}'
+    )
+    return [normalize(query['sql']) for query in queries]
+
+
+def sql_diff(before, after, before_name, after_name):
+    return '\n'.join(difflib.unified_diff(
+        before, after, before_name, after_name, lineterm='', n=1
+    ))
+
+
+class QueryBudgets:
+    """Бюджеты из BUDGET_FILE; с update новые значения записываются в файл."""
+
+    def __init__(self, path=BUDGET_FILE, update=False):
+        self.path = path
+        self.update = update
+        self.budgets = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.budgets = json.load(file)
+        self.changed = False
+
+    def check(self, name, small, large):
+        """
+        small и large — SQL страницы name на маленьких и больших данных.
+        """
+        problems = []
+        if len(small) != len(large):
+            problems.append(
+                f'число запросов зависит от данных: {len(small)} на '
+                f'маленьких и {len(large)} на больших\n'
+                + sql_diff(small, large, 'маленькие', 'большие')
+            )
+        budget = self.budgets.get(name)
+        if self.update:
+            if budget is None or budget['sql'] != large:
+                self.budgets[name] = {'queries': len(large), 'sql': large}
+                self.changed = True
+        elif budget is None:
+            problems.append(
+                'бюджета нет в query_budgets.json, добавьте его: '
+                'pytest --update-query-budgets'
+            )
+        elif len(large) > budget['queries']:
+            problems.append(
+                f'бюджет {budget["queries"]} превышен: {len(large)}\n'
+                + sql_diff(budget['sql'], large, 'бюджет', 'сейчас')
+            )
+        assert not problems, (
+            f'Запросы страницы `{name}`: ' + '\n'.join(problems)
+        )
+
+    def save(self):
+        if not self.changed:
+            return
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump(self.budgets, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            file.write('\n')
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import BASE_DIR
+
+# бенчмарки вызывают view в обход URLconf и ломаются молча при
+# изменении декораторов; здесь они прогоняются на малых данных
+COMMANDS = {
+    'templates': ['--repeat', '1', '--posts', '2'],
+    'render': ['--repeat', '1'],
+}
+
+
+@pytest.mark.parametrize('name', COMMANDS)
+def test_benchmark_runs(name):
+    result = subprocess.run(
+        [sys.executable, '-m', f'benchmarks.{name}', *COMMANDS[name]],
+        cwd=BASE_DIR, stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, timeout=300,
+    )
+    assert result.returncode == 0, (
+        f'Бенчмарк `benchmarks.{name}` завершился с ошибкой:\n\n'
+        f'{result.stdout.decode("UTF-8")}'
+    )
@@ -0,0 +1,118 @@
+import pytest
+from yatube.cache import SQLiteCache, TwoTierCache
+
+
+def worker(path):
+    cache = TwoTierCache('shared', {'OPTIONS': {'SYNC_INTERVAL': 0}})
+    cache.shared = SQLiteCache(path, {})
+    return cache
+
+
+class TestTwoTierCache:
+
+    @pytest.fixture(autouse=True)
+    def workers(self, tmp_path):
+        path = str(tmp_path / 'cache.sqlite3')
+        # два «процесса»: у каждого своя память, общий файл SQLite
+        self.first = worker(path)
+        self.second = worker(path)
+
+    def test_shared_values(self):
+        """Значения, записанные одним процессом, видны другому."""
+        self.first.set('key', {'value': 1})
+        assert self.second.get('key') == {'value': 1}
+        assert self.second.get_many(['key', 'missing']) == {
+            'key': {'value': 1}
+        }
+        assert not self.second.add('key', 2)
+        assert self.second.get('missing') is None
+
+    def test_invalidation_reaches_other_process(self):
+        """
+        set, delete и incr одного процесса убирают устаревшее значение
+        из памяти другого.
+        """
+        self.first.set('key', 1)
+        assert self.second.get('key') == 1
+
+        self.first.set('key', 2)
+        assert self.second.get('key') == 2
+
+        assert self.first.incr('key') == 3
+        assert self.second.get('key') == 3
+
+        self.first.delete('key')
+        assert self.second.get('key') is None
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение берётся из памяти процесса."""
+        self.first.set('key', 'value')
+        self.first.shared.clear()
+        assert self.first.get('key') == 'value'
+
+    def test_counters_are_not_journaled(self):
+        """
+        Числа не хранятся в памяти процесса, поэтому incr пишет
+        в общий кеш один раз, без записи в журнал.
+        """
+        self.first.set('counter', 1)
+        assert self.second.get('counter') == 1
+        assert self.second.make_key('counter') not in self.second._local
+        seq = self.first.shared.get(self.first._journal_seq_key())
+        for _ in range(3):
+            self.first.incr('counter')
+        assert self.first.shared.get(self.first._journal_seq_key()) == seq
+        assert self.second.get('counter') == 4
+
+    def test_local_tier_is_bounded(self):
+        """
+        В памяти процесса хранится не больше LOCAL_MAX_ENTRIES ключей,
+        вытесняются самые старые.
+        """
+        self.first._local_max_entries = 2
+        for key in ('a', 'b', 'c'):
+            self.first.set(key, key)
+        assert len(self.first._local) == 2
+        assert self.first.make_key('a') not in self.first._local
+        assert self.first.get('a') == 'a'
+
+
+class TestSQLiteCache:
+
+    @pytest.fixture(autouse=True)
+    def cache(self, tmp_path):
+        self.cache = SQLiteCache(
+            str(tmp_path / 'cache.sqlite3'), {'OPTIONS': {'MAX_ENTRIES': 2}}
+        )
+
+    def test_cull_runs_by_interval(self):
+        """
+        Лишние записи удаляются не при каждой записи, а раз
+        в cull_interval секунд, по индексу срока жизни.
+        """
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, key)
+        assert len(self.cache.get_many(['a', 'b', 'c'])) == 3
+
+        self.cache._culled_at -= self.cache.cull_interval
+        self.cache.set('d', 'd')
+        assert len(self.cache.get_many(['a', 'b', 'c', 'd'])) == 2
+        indexes = self.cache._db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        ).fetchall()
+        assert ('cache_expires',) in indexes, (
+            'Отбор записей для удаления должен идти по индексу срока жизни.'
+        )
+
+    def test_cull_keeps_keys_without_timeout(self):
+        """
+        Ключи без срока жизни (поколения, счётчики) не вытесняются,
+        сколько бы записей со сроком ни было.
+        """
+        self.cache.set('generation:all', 1, None)
+        for number in range(5):
+            self.cache.set(f'k{number}', number)
+        self.cache._culled_at -= self.cache.cull_interval
+        self.cache.set('k5', 5)
+        assert self.cache.get('generation:all') == 1
+        assert len(self.cache.get_many([f'k{n}' for n in range(6)])) == 2
@@ -0,0 +1,162 @@
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+from tests.query_budget import capture
+
+User = get_user_model()
+
+# на больших данных страницы списков заполнены целиком и есть следующие
+POSTS = 25
+COMMENT_AUTHORS = 5
+
+DERIVATIVES = json.dumps([
+    {'name': f'posts/derivatives/cat-{width}.{name}', 'format': name,
+     'width': width, 'height': width * 339 // 960, 'size': 1000}
+    for width in (360, 960) for name in ('webp', 'jpeg')
+])
+
+# страница: (кто запрашивает, адрес)
+ROUTES = {
+    'index': ('guest', lambda site: reverse('index')),
+    'new_post': ('writer', lambda site: reverse('new_post')),
+    'post_edit': ('writer', lambda site: reverse(
+        'post_edit', args=[site.writer.username, site.post.pk]
+    )),
+    'add_comment': ('reader', lambda site: reverse(
+        'add_comment', args=[site.writer.username, site.post.pk]
+    )),
+    'group_posts': ('guest', lambda site: reverse(
+        'group_posts', args=[site.group.slug]
+    )),
+    'follow_index': ('reader', lambda site: reverse('follow_index')),
+    'search': ('guest', lambda site: reverse('search') + '?q=котики'),
+    'tag_posts': ('guest', lambda site: reverse('tag_posts', args=['котики'])),
+    'mentions': ('reader', lambda site: reverse('mentions')),
+    'profile': ('reader', lambda site: reverse(
+        'profile', args=[site.writer.username]
+    )),
+    'post': ('reader', lambda site: reverse(
+        'post', args=[site.writer.username, site.post.pk]
+    )),
+    'profile_follow': ('reader', lambda site: reverse(
+        'profile_follow', args=[site.writer.username]
+    )),
+    'profile_unfollow': ('reader', lambda site: reverse(
+        'profile_unfollow', args=[site.writer.username]
+    )),
+    'signup': ('guest', lambda site: reverse('signup')),
+    'about:author': ('guest', lambda site: reverse('about:author')),
+    'about:tech': ('guest', lambda site: reverse('about:tech')),
+    'api:posts': ('guest', lambda site: reverse('api:posts')),
+    'api:post': ('guest', lambda site: reverse(
+        'api:post', args=[site.post.pk]
+    )),
+    'api:comments': ('guest', lambda site: reverse(
+        'api:comments', args=[site.post.pk]
+    )),
+    'api:groups': ('guest', lambda site: reverse('api:groups')),
+    'api:group': ('guest', lambda site: reverse(
+        'api:group', args=[site.group.slug]
+    )),
+    'api:group_posts': ('guest', lambda site: reverse(
+        'api:group_posts', args=[site.group.slug]
+    )),
+    'api:profile': ('reader', lambda site: reverse(
+        'api:profile', args=[site.writer.username]
+    )),
+    'api:profile_posts': ('guest', lambda site: reverse(
+        'api:profile_posts', args=[site.writer.username]
+    )),
+    'api:follow': ('reader', lambda site: reverse(
+        'api:follow', args=[site.writer.username]
+    )),
+    'api:feed': ('reader', lambda site: reverse('api:feed')),
+}
+
+
+def image_fields(number):
+    if number % 3 == 0:
+        return {}
+    if number % 3 == 1:
+        return {'image': 'posts/cat.jpg'}
+    return {'image': 'posts/cat.jpg', 'image_derivatives': DERIVATIVES}
+
+
+class Site:
+    """Данные для страниц: сначала несколько постов и один комментарий."""
+
+    def __init__(self):
+        self.writer = User.objects.create_user(username='writer')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Котики', slug='cats', description='Группа про котиков'
+        )
+        # по посту каждого вида: без картинки, с картинкой без копий и с копиями
+        self.post, *_ = [self.add_post(self.writer, **image_fields(number))
+                         for number in range(3)]
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.clients = {'guest': Client()}
+        for kind in ('writer', 'reader'):
+            self.clients[kind] = Client()
+            self.clients[kind].force_login(getattr(self, kind))
+
+    def add_post(self, author, **fields):
+        return Post.objects.create(
+            text='Пост про #котики для @reader', author=author,
+            group=self.group, **fields
+        )
+
+    def grow(self):
+        """Добавляет посты разных авторов, картинки и комментарии."""
+        authors = [User.objects.create_user(username=f'author{number}')
+                   for number in range(COMMENT_AUTHORS)]
+        for author in authors:
+            Follow.objects.create(user=self.reader, author=author)
+        for number in range(POSTS):
+            author = authors[number % len(authors)] if number % 2 else (
+                self.writer
+            )
+            post = self.add_post(author, **image_fields(number))
+            Comment.objects.create(post=post, author=author, text='Ещё')
+        for author in authors:
+            Comment.objects.create(post=self.post, author=author,
+                                   text=f'Комментарий {author.username}')
+
+    def fetch(self, name):
+        kind, url = ROUTES[name]
+        # profile_unfollow отписывает читателя, страницы ждут подписку
+        Follow.objects.get_or_create(user=self.reader, author=self.writer)
+        return capture(self.clients[kind], url(self))
+
+
+class TestQueryBudget:
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('name', ROUTES)
+    def test_queries_do_not_grow(self, name, query_budgets):
+        site = Site()
+        small = site.fetch(name)
+        site.grow()
+        large = site.fetch(name)
+        query_budgets.check(name, small, large)
+
+    def test_every_route_is_checked(self):
+        import about.urls
+        import api.urls
+        from posts.urls import urlpatterns as posts_urls
+        from users.urls import urlpatterns as users_urls
+
+        names = {pattern.name for pattern in posts_urls + users_urls}
+        for urls in (about.urls, api.urls):
+            names |= {f'{urls.app_name}:{pattern.name}'
+                      for pattern in urls.urlpatterns}
+        assert set(ROUTES) == names, (
+            'Добавьте новые страницы в ROUTES в tests/test_query_budget.py: '
+            f'{sorted(names - set(ROUTES))}'
+        )
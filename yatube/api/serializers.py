@@ -0,0 +1,89 @@
+"""
+Представление записей в JSON.
+
+Для каждого вида записей — словарь {поле: функция}; клиент может
+запросить только нужные поля (?fields=id,text), остальные не
+вычисляются.
+"""
+from django.urls import reverse
+from posts import rendering
+
+
+class BadRequest(Exception):
+    """Неверные параметры запроса; API отвечает кодом 400."""
+
+
+def image(post):
+    return post.image.url if post.image else None
+
+
+def derivatives(post):
+    """Копии картинки разных ширин и форматов, см. posts.thumbnails."""
+    storage = post.image.storage
+    return [
+        {'url': storage.url(item['name']), 'format': item['format'],
+         'width': item['width'], 'height': item['height']}
+        for item in post.derivatives()
+    ]
+
+
+POST = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'text_html': lambda post: str(rendering.html(post)),
+    'pub_date': lambda post: post.pub_date,
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': image,
+    'derivatives': derivatives,
+    'comments_count': lambda post: post.comments_count,
+    'version': lambda post: post.version,
+    'url': lambda post: reverse('api:post', args=[post.pk]),
+}
+
+COMMENT = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'text_html': lambda comment: str(rendering.html(comment)),
+    'created': lambda comment: comment.created,
+}
+
+GROUP = {
+    'slug': lambda group: group.slug,
+    'title': lambda group: group.title,
+    'description': lambda group: group.description,
+    'url': lambda group: reverse('api:group', args=[group.slug]),
+}
+
+PROFILE = {
+    'username': lambda author: author.username,
+    'full_name': lambda author: author.get_full_name(),
+    'posts_count': lambda author: author.stats.posts_count,
+    'followers_count': lambda author: author.stats.followers_count,
+    'following_count': lambda author: author.stats.following_count,
+    # подписан ли на автора тот, кто запрашивает (None — аноним)
+    'following': lambda author: author.following_by_user,
+    'url': lambda author: reverse('api:profile', args=[author.username]),
+}
+
+
+def requested_fields(request, fields):
+    """
+    Поля из ?fields=a,b, по умолчанию все. Неизвестные поля —
+    BadRequest.
+    """
+    names = [name for name in request.GET.get('fields', '').split(',')
+             if name]
+    unknown = set(names) - set(fields)
+    if unknown:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}; '
+            f'доступны: {", ".join(fields)}'
+        )
+    return names or list(fields)
+
+
+def serialize(obj, fields, names):
+    return {name: fields[name](obj) for name in names}
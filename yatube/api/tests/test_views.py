@@ -0,0 +1,221 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='leomessi')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котиков'
+        )
+        self.posts = [
+            Post.objects.create(text=f'Пост {number} про #котиков',
+                                author=self.author, group=self.group)
+            for number in range(3)
+        ]
+        self.post = self.posts[-1]
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def get(self, url, client=None, **headers):
+        response = (client or self.guest_client).get(url, **headers)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_posts_are_paginated_with_cursor(self):
+        """Проверка: списки листаются курсором по limit записей."""
+        url = reverse('api:posts')
+        first = self.get(url + '?limit=2')
+        self.assertEqual([post['id'] for post in first['results']],
+                         [self.posts[2].pk, self.posts[1].pk])
+        self.assertIsNone(first['previous'])
+        second = self.get(first['next'])
+        self.assertEqual([post['id'] for post in second['results']],
+                         [self.posts[0].pk])
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            self.get(second['previous'])['results'], first['results']
+        )
+
+    def test_post_fields(self):
+        """Проверка: пост отдаётся целиком или только с ?fields."""
+        data = self.get(reverse('api:post', args=[self.post.pk]))
+        self.assertEqual(data['author'], 'leomessi')
+        self.assertEqual(data['group'], 'cats')
+        self.assertEqual(data['comments_count'], 1)
+        self.assertIn('/tag/', data['text_html'])
+
+        data = self.get(
+            reverse('api:post', args=[self.post.pk]) + '?fields=id,text'
+        )
+        self.assertEqual(data, {'id': self.post.pk, 'text': self.post.text})
+        response = self.guest_client.get(
+            reverse('api:posts') + '?fields=id,password'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_lists(self):
+        """Проверка: группы, профиль, комментарии и лента подписок."""
+        self.assertEqual(
+            len(self.get(reverse('api:group_posts', args=['cats']))[
+                'results'
+            ]), 3
+        )
+        self.assertEqual(
+            self.get(reverse('api:groups'))['results'][0]['slug'], 'cats'
+        )
+        comments = self.get(reverse('api:comments', args=[self.post.pk]))
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        profile = self.get(reverse('api:profile', args=['leomessi']),
+                           self.reader_client)
+        self.assertEqual(profile['posts_count'], 3)
+        self.assertEqual(profile['followers_count'], 1)
+        self.assertTrue(profile['following'])
+        feed = self.get(reverse('api:feed'), self.reader_client)
+        self.assertEqual(len(feed['results']), 3)
+        self.assertEqual(
+            self.guest_client.get(reverse('api:feed')).status_code, 401
+        )
+
+    def test_not_modified(self):
+        """
+        Проверка: с If-None-Match неизменённые данные отдаются кодом 304
+        без запросов к базе для списков, изменение даёт новый ETag.
+        """
+        for url in (reverse('api:posts'),
+                    reverse('api:group_posts', args=['cats']),
+                    reverse('api:profile_posts', args=['leomessi']),
+                    reverse('api:post', args=[self.post.pk]),
+                    reverse('api:comments', args=[self.post.pk])):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+        url = reverse('api:posts')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        post_url = reverse('api:post', args=[self.post.pk])
+        post_etag = self.guest_client.get(post_url)['ETag']
+        self.reader_client.post(
+            reverse('api:comments', args=[self.post.pk]),
+            {'text': 'Ещё комментарий'},
+        )
+        for url, old in ((url, etag), (post_url, post_etag)):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=old)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], old)
+
+    def test_create_and_edit_post(self):
+        """
+        Проверка: пост создаёт вошедший пользователь, изменяет и удаляет
+        только автор; изменение устаревшей версии отклоняется.
+        """
+        url = reverse('api:posts')
+        self.assertEqual(
+            self.guest_client.post(url, {'text': 'Новый'}).status_code, 401
+        )
+        response = self.reader_client.post(
+            url, json.dumps({'text': 'Новый', 'group': 'cats'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual((post.author, post.group), (self.reader, self.group))
+        self.assertEqual(response['Location'],
+                         reverse('api:post', args=[post.pk]))
+        self.assertEqual(
+            self.reader_client.post(url, {'text': ''}).status_code, 400
+        )
+
+        post_url = reverse('api:post', args=[post.pk])
+        etag = self.reader_client.get(post_url)['ETag']
+        patch = json.dumps({'text': 'Исправленный'})
+        self.assertEqual(self.author_client.patch(
+            post_url, patch, content_type='application/json'
+        ).status_code, 403)
+        response = self.reader_client.patch(
+            post_url, patch, content_type='application/json',
+            HTTP_IF_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.group), ('Исправленный', self.group))
+        self.assertEqual(self.reader_client.patch(
+            post_url, patch, content_type='application/json',
+            HTTP_IF_MATCH=etag,
+        ).status_code, 412)
+
+        self.assertEqual(self.reader_client.delete(post_url).status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+
+    def test_follow(self):
+        """Проверка: подписка и отписка через API."""
+        url = reverse('api:follow', args=['leomessi'])
+        self.assertEqual(self.reader_client.put(url).status_code, 204)
+        self.assertTrue(self.get(url, self.reader_client)['following'])
+        self.assertEqual(self.reader_client.delete(url).status_code, 204)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.author_client.put(url).status_code, 400)
+
+    def test_not_found(self):
+        """Проверка: несуществующая запись — 404 в JSON."""
+        response = self.guest_client.get(reverse('api:post', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
+
+    def test_comment_edit_gives_new_etag(self):
+        """
+        Проверка: правка комментария меняет ETag комментариев и поста,
+        старые данные не отдаются кодом 304.
+        """
+        urls = (reverse('api:comments', args=[self.post.pk]),
+                reverse('api:post', args=[self.post.pk]))
+        etags = [self.guest_client.get(url)['ETag'] for url in urls]
+        comment = self.post.comments.get()
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url,
+                                                 HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            self.get(urls[0])['results'][0]['text'],
+            'Исправленный комментарий'
+        )
+
+    def test_bad_request(self):
+        """Проверка: неверные параметры и тело запроса — 400 в JSON."""
+        response = self.guest_client.get(reverse('api:posts') + '?limit=abc')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('limit', response.json()['detail'])
+        response = self.reader_client.post(
+            reverse('api:posts'), '{', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.reader_client.post(
+            reverse('api:posts'), {'text': 'Пост', 'group': 'dogs'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('dogs', response.json()['detail'])
@@ -0,0 +1,299 @@
+"""
+JSON API: посты, группы, профили, комментарии и лента подписок.
+
+Списки листаются курсором (?cursor=, см. posts.paginator) по
+?limit= записей, ?fields= оставляет в ответе только нужные поля.
+Ответы GET несут строгий ETag: у списков он строится из поколений кеша
+страниц (posts.cache.scoped_etag) без запросов к базе, у поста и его
+комментариев — из Post.version одним лёгким запросом. На запрос с
+If-None-Match, совпадающим с ETag, отвечает condition() кодом 304, view
+не выполняется. Изменение поста с If-Match устаревшей версии
+отклоняется кодом 412.
+
+Пишут в API с сессией и CSRF-токеном, как формы сайта.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition, require_http_methods
+from posts import counters, feed as feeds, thumbnails, uploads
+from posts.cache import forget_card, scoped_etag
+from posts.forms import CommentForm, PostForm
+from posts.models import Follow, Group, Post, User
+from posts.paginator import CursorPaginator
+
+from . import serializers
+from .serializers import BadRequest
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def error(status, detail, **extra):
+    return JsonResponse({'detail': detail, **extra}, status=status)
+
+
+def api_view(*methods, login=False):
+    """
+    Разрешённые методы; запись (а с login и чтение) — только после
+    входа. Ошибки отдаются JSON: 404 и 400 для неверных параметров.
+    """
+    def decorator(view):
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            writes = request.method not in ('GET', 'HEAD')
+            if (login or writes) and not request.user.is_authenticated:
+                return error(401, 'Нужно войти.')
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error(404, 'Не найдено.')
+            except BadRequest as exc:
+                return error(400, str(exc))
+        return wrapper
+    return decorator
+
+
+def digest(*parts):
+    return hashlib.md5(json.dumps(parts).encode()).hexdigest()
+
+
+def version_etag(kind, post_id, version, request):
+    """ETag поста и его комментариев; меняется с Post.version."""
+    etag = f'{kind}.{post_id}.{version}'
+    # If-Match изменения поста сверяется с ETag без параметров
+    if request.GET:
+        etag += '.' + digest(request.GET.urlencode())[:8]
+    return etag
+
+
+def post_version_etag(kind):
+    def etag(request, post_id):
+        version = Post.objects.filter(pk=post_id).values_list(
+            'version', flat=True
+        ).first()
+        if version is None:
+            return None
+        return version_etag(kind, post_id, version, request)
+    return etag
+
+
+def limit(request):
+    value = request.GET.get('limit', DEFAULT_LIMIT)
+    try:
+        return min(max(int(value), 1), MAX_LIMIT)
+    except (TypeError, ValueError):
+        raise BadRequest(f'Неверный limit: {value}')
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def page_response(request, queryset, fields, date_field='pub_date'):
+    names = serializers.requested_fields(request, fields)
+    paginator = CursorPaginator(queryset, limit(request),
+                                date_field=date_field)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serializers.serialize(obj, fields, names)
+                    for obj in page],
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.previous_cursor),
+    })
+
+
+def object_response(request, obj, fields, status=200):
+    names = serializers.requested_fields(request, fields)
+    return JsonResponse(serializers.serialize(obj, fields, names),
+                        status=status)
+
+
+def form_data(request, initial=None):
+    """
+    Данные формы из JSON или из обычной формы; группа указывается по
+    slug. initial — текущие значения полей для частичного изменения.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise BadRequest('Тело запроса — не JSON.')
+        if not isinstance(data, dict):
+            raise BadRequest('Тело запроса должно быть объектом JSON.')
+    elif request.method == 'POST':
+        data = request.POST.dict()
+    else:
+        # PATCH Django не разбирает
+        data = QueryDict(request.body).dict()
+    data = {**(initial or {}), **data}
+    if data.get('group'):
+        group = Group.objects.filter(slug=data['group']).first()
+        if group is None:
+            raise BadRequest(f'Нет группы {data["group"]}.')
+        data['group'] = group.pk
+    return data
+
+
+def form_errors(form):
+    return error(400, 'Неверные данные.', errors=form.errors)
+
+
+@uploads.image_uploads
+@api_view('GET', 'POST')
+@condition(etag_func=scoped_etag('all'))
+def posts(request):
+    if request.method == 'POST':
+        return create_post(request)
+    return page_response(request, Post.objects.for_list(), serializers.POST)
+
+
+@transaction.atomic
+def create_post(request):
+    form = PostForm(form_data(request), files=request.FILES or None)
+    if not form.is_valid():
+        return form_errors(form)
+    new = form.save(commit=False)
+    new.author = request.user
+    new.save()
+    thumbnails.schedule(new)
+    response = object_response(request, new, serializers.POST, status=201)
+    response['Location'] = reverse('api:post', args=[new.pk])
+    return response
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+@condition(etag_func=post_version_etag('post'))
+def post(request, post_id):
+    post = get_object_or_404(Post.objects.for_list(), pk=post_id)
+    if request.method == 'GET':
+        return object_response(request, post, serializers.POST)
+    if post.author_id != request.user.pk:
+        return error(403, 'Изменять пост может только автор.')
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    return edit_post(request, post)
+
+
+@transaction.atomic
+def edit_post(request, post):
+    initial = {'text': post.text,
+               'group': post.group.slug if post.group_id else ''}
+    form = PostForm(form_data(request, initial), instance=post)
+    if not form.is_valid():
+        return form_errors(form)
+    forget_card(post)
+    form.save()
+    response = object_response(request, post, serializers.POST)
+    response['ETag'] = quote_etag(
+        version_etag('post', post.pk, post.version, request)
+    )
+    return response
+
+
+@api_view('GET', 'POST')
+@condition(etag_func=post_version_etag('comments'))
+def comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    if request.method == 'POST':
+        return create_comment(request, post)
+    return page_response(
+        request, post.comments.select_related('author'),
+        serializers.COMMENT, date_field='created',
+    )
+
+
+@transaction.atomic
+def create_comment(request, post):
+    form = CommentForm(form_data(request))
+    if not form.is_valid():
+        return form_errors(form)
+    comment = form.save(commit=False)
+    comment.post = post
+    comment.author = request.user
+    comment.save()
+    forget_card(post)
+    return object_response(request, comment, serializers.COMMENT,
+                           status=201)
+
+
+@api_view('GET')
+@condition(etag_func=scoped_etag('groups'))
+def groups(request):
+    names = serializers.requested_fields(request, serializers.GROUP)
+    return JsonResponse({'results': [
+        serializers.serialize(group, serializers.GROUP, names)
+        for group in Group.objects.order_by('title')
+    ]})
+
+
+@api_view('GET')
+@condition(etag_func=scoped_etag('group:{slug}'))
+def group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return object_response(request, group, serializers.GROUP)
+
+
+@api_view('GET')
+@condition(etag_func=scoped_etag('group:{slug}'))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return page_response(request, group.posts.for_list(), serializers.POST)
+
+
+@api_view('GET')
+@condition(etag_func=scoped_etag('author:{username}', per_user=True))
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    author.stats = counters.stats_for(author)
+    author.following_by_user = None
+    if request.user.is_authenticated:
+        author.following_by_user = author.following.filter(
+            user=request.user
+        ).exists()
+    return object_response(request, author, serializers.PROFILE)
+
+
+@api_view('GET')
+@condition(etag_func=scoped_etag('author:{username}'))
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return page_response(request, author.posts.for_list(), serializers.POST)
+
+
+@api_view('GET', 'PUT', 'DELETE', login=True)
+@transaction.atomic
+def follow(request, username):
+    author = get_object_or_404(User, username=username)
+    follows = Follow.objects.filter(user=request.user, author=author)
+    if request.method == 'GET':
+        return JsonResponse({'following': follows.exists()})
+    if request.method == 'DELETE':
+        follows.delete()
+    elif author == request.user:
+        return error(400, 'Нельзя подписаться на себя.')
+    else:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return HttpResponse(status=204)
+
+
+@api_view('GET', login=True)
+@condition(etag_func=scoped_etag('all', 'author:{user}', per_user=True))
+def feed(request):
+    posts = feeds.for_user(request.user).for_list()
+    return page_response(request, posts, serializers.POST,
+                         date_field='feed_date')
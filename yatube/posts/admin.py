@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Group, Post
 
 
@@ -13,6 +14,14 @@ class PostAdmin(admin.ModelAdmin):
     # добавляем возможность фильтрации по дате
     list_filter = ("pub_date",)
 
+    def get_search_results(self, request, queryset, search_term):
+        # ищем по полнотекстовому индексу, а не LIKE по всей таблице
+        if not search_term.strip() or not search.supported():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=search.post_ids(search_term)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "description")
@@ -20,6 +29,16 @@ class GroupAdmin(admin.ModelAdmin):
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ("text", "author")
+    search_fields = ("text",)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not search.supported():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            pk__in=search.comment_ids(search_term)
+        ), False
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,167 @@
+import hashlib
+import inspect
+import json
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.middleware.cache import CacheMiddleware
+from django.utils.cache import patch_vary_headers
+
+from . import metrics, profiling
+
+GENERATION_PREFIX = 'generation:'
+
+
+def card_key(post):
+    """Ключ фрагмента {% cache ... post_card post.id post.version %}."""
+    return make_template_fragment_key('post_card', [post.id, post.version])
+
+
+def forget_card(post):
+    """Удаляет из кеша карточку поста в её текущей версии."""
+    cache.delete(card_key(post))
+
+
+def new_generation():
+    # потерянное (вытесненное) поколение начинается заново с отметки
+    # времени, а не с нуля, чтобы не совпасть со старыми ключами страниц
+    return int(time.time() * 1000)
+
+
+def generations(scopes):
+    """
+    Текущие поколения областей ('all', 'group:<slug>', 'author:<username>').
+    Поколение растёт при каждом изменении данных области.
+    """
+    keys = [GENERATION_PREFIX + scope for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, new_generation(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump(*scopes):
+    """
+    Сбрасывает закешированные страницы перечисленных областей.
+
+    Внутри транзакции сброс повторяется после фиксации: иначе страница,
+    собранная до фиксации, снова закешировала бы старые данные.
+    """
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = GENERATION_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, new_generation(), None)
+        metrics.incr(f'page_cache.{scope.split(":")[0]}.invalidation')
+
+
+def post_scopes(post):
+    scopes = ['all', f'author:{post.author.username}']
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def posts_scopes(posts):
+    """Области всех постов запроса posts (как post_scopes), одним запросом."""
+    scopes = {'all'}
+    rows = posts.values_list('author__username', 'group__slug').distinct()
+    for username, slug in rows:
+        scopes.add(f'author:{username}')
+        if slug is not None:
+            scopes.add(f'group:{slug}')
+    return scopes
+
+
+def cache_page_versioned(timeout, key_prefix, scopes=('all',)):
+    """
+    Как cache_page, но ключ страницы включает поколения областей scopes
+    (шаблоны с параметрами view, например 'group:{slug}'), поэтому
+    страница живёт timeout секунд или до первого bump() своей области.
+    """
+    def decorator(view):
+        signature = inspect.signature(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # параметры по имени, даже если view вызвали позиционно
+            params = signature.bind(request, *args, **kwargs).arguments
+            names = [scope.format(**params) for scope in scopes]
+            version = '.'.join(map(str, generations(names)))
+            middleware = CacheMiddleware(
+                cache_timeout=timeout, key_prefix=f'{key_prefix}:{version}'
+            )
+            response = middleware.process_request(request)
+            if response is not None:
+                metrics.incr(f'page_cache.{key_prefix}.hit')
+                profiling.cache_lookup(hits=1)
+                return response
+            metrics.incr(f'page_cache.{key_prefix}.miss')
+            profiling.cache_lookup(misses=1)
+            response = view(request, *args, **kwargs)
+            # страница зависит от пользователя (меню, кнопки), а Vary от
+            # SessionMiddleware появится уже после кеширования
+            patch_vary_headers(response, ('Cookie',))
+            return middleware.process_response(request, response)
+        return wrapper
+    return decorator
+
+
+def scoped_etag(*scopes, per_user=False, extra=None, exists=None):
+    """
+    etag_func для django.views.decorators.http.condition: ETag из
+    поколений областей scopes (шаблоны с параметрами view и {user} —
+    именем того, кто запрашивает). Поколения меняются при любом
+    изменении данных области, поэтому ETag считается без запросов
+    к базе и ответ 304 не выполняет view.
+
+    С per_user ETag свой у каждого пользователя и CSRF-токена: страница
+    показывает имя и формы. extra(request, *args, **kwargs) добавляет
+    к ETag своё значение; None от extra — записи нет, view ответит 404.
+
+    exists(request, *args, **kwargs) проверяет запись только у запроса
+    с If-None-Match: иначе ETag лишь добавляется к ответу view, а ответ
+    404 его не получает. Без записи ETag нет, и вместо 304 будет 404.
+
+    URLconf передаёт параметры view по имени; при позиционном вызове
+    имена областей не известны, ETag не строится и view выполняется.
+    """
+    def etag(request, *args, **kwargs):
+        parts = [request.get_full_path()]
+        if extra is not None:
+            value = extra(request, *args, **kwargs)
+            if value is None:
+                return None
+            parts.append(value)
+        if (exists is not None and 'HTTP_IF_NONE_MATCH' in request.META
+                and not exists(request, *args, **kwargs)):
+            return None
+        user = request.user.get_username()
+        try:
+            names = [scope.format(user=user, **kwargs) for scope in scopes]
+        except (IndexError, KeyError):
+            return None
+        parts.extend(generations(names))
+        if per_user:
+            parts += [user, request.META.get('CSRF_COOKIE', '')]
+        return hashlib.md5(json.dumps(parts).encode()).hexdigest()
+    return etag
+
+
+def page_cache_stats(key_prefixes, scopes=('all', 'group', 'author')):
+    names = [f'page_cache.{prefix}.{event}'
+             for prefix in key_prefixes for event in ('hit', 'miss')]
+    names += [f'page_cache.{scope}.invalidation' for scope in scopes]
+    return metrics.snapshot(names)
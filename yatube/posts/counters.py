@@ -0,0 +1,77 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _change(queryset, field, delta, **extra):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta}, **extra)
+
+
+def change_user(user_id, field, delta):
+    _change(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def change_post(post_id, field, delta):
+    # счётчик виден в карточке поста, поэтому меняется и версия поста
+    _change(
+        Post.objects.filter(pk=post_id), field, delta,
+        version=F('version') + 1,
+    )
+
+
+def stats_for(user):
+    """Счётчики пользователя; недостающая строка создаётся пустой."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats.objects.get_or_create(user=user)[0]
+
+
+def _actual(model, field, ref):
+    rows = model.objects.filter(**{field: OuterRef(ref)}).order_by().values(
+        field
+    ).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(rows), 0)
+
+
+def counters():
+    """Пары (queryset, поле, фактическое значение) для всех счётчиков."""
+    return (
+        (UserStats.objects, 'posts_count',
+         _actual(Post, 'author', 'user_id')),
+        (UserStats.objects, 'followers_count',
+         _actual(Follow, 'author', 'user_id')),
+        (UserStats.objects, 'following_count',
+         _actual(Follow, 'user', 'user_id')),
+        (Post.objects, 'comments_count',
+         _actual(Comment, 'post', 'pk')),
+    )
+
+
+def recount(fix=True):
+    """
+    Сверяет счётчики с таблицами и, если fix, исправляет расхождения.
+    Возвращает число расходящихся строк для каждого счётчика.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    if fix:
+        UserStats.objects.bulk_create(
+            (UserStats(user_id=pk) for pk in missing.iterator()),
+            ignore_conflicts=True,
+        )
+    drift = {}
+    for queryset, field, actual in counters():
+        stale = queryset.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        )
+        drift[field] = stale.count()
+        if fix and drift[field]:
+            queryset.filter(
+                pk__in=list(stale.values_list('pk', flat=True))
+            ).update(**{field: actual})
+    return drift
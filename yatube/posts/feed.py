@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Q
+
+from .models import FeedItem, Follow, Post, PullAuthor, UserStats
+
+
+def fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+
+def backfill_limit():
+    return getattr(settings, 'FEED_BACKFILL_LIMIT', 1000)
+
+
+def is_pull_author(author_id):
+    return PullAuthor.objects.filter(author_id=author_id).exists()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_pull_author(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id)
+    if UserStats.objects.filter(
+        user_id=post.author_id, followers_count__gt=fanout_limit()
+    ).exists():
+        make_pull_author(post.author_id)
+        return
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.values_list('user_id', flat=True)),
+        ignore_conflicts=True,
+    )
+
+
+def make_pull_author(author_id):
+    """
+    Переводит автора в режим чтения при запросе: его посты больше
+    не хранятся в лентах подписчиков.
+    """
+    PullAuthor.objects.get_or_create(author_id=author_id)
+    FeedItem.objects.filter(post__author_id=author_id).delete()
+
+
+def subscribe(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    if is_pull_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )[:backfill_limit()]
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        ignore_conflicts=True,
+    )
+
+
+def unsubscribe(user_id, author_id):
+    FeedItem.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def fill(chunk_size=10000):
+    """
+    Раскладывает по лентам посты всех подписок, как если бы каждый пост
+    прошёл через fan_out: для загрузки данных пачками, когда сигналы не
+    срабатывают. Авторы, у которых подписчиков больше fanout_limit(),
+    становятся PullAuthor. Уже разложенные посты пропускаются; подписки
+    обрабатываются частями по chunk_size, каждая в своей транзакции.
+    """
+    popular = Follow.objects.values('author_id').annotate(
+        followers=Count('*')
+    ).filter(followers__gt=fanout_limit()).values_list('author_id', flat=True)
+    for author_id in popular.iterator():
+        make_pull_author(author_id)
+    bounds = Follow.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['last'] is None:
+        return
+    sql = (
+        f'INSERT INTO {FeedItem._meta.db_table} (user_id, post_id, pub_date) '
+        'SELECT f.user_id, p.id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+        'WHERE f.id >= %s AND f.id < %s AND f.author_id NOT IN '
+        f'(SELECT author_id FROM {PullAuthor._meta.db_table}) '
+        f'AND NOT EXISTS (SELECT 1 FROM {FeedItem._meta.db_table} i '
+        'WHERE i.user_id = f.user_id AND i.post_id = p.id)'
+    )
+    for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [start, start + chunk_size])
+
+
+def for_user(user):
+    """
+    Лента подписок пользователя.
+
+    Обычно это чтение диапазона FeedItem по индексу (user, pub_date);
+    посты авторов-«знаменитостей» добавляются при чтении. Дата, по которой
+    упорядочена лента, доступна как feed_date.
+    """
+    pull_authors = list(
+        PullAuthor.objects.filter(
+            author__following__user=user
+        ).values_list('author_id', flat=True)
+    )
+    if not pull_authors:
+        return Post.objects.filter(feed_items__user=user).annotate(
+            feed_date=F('feed_items__pub_date')
+        ).order_by('-feed_date')
+    return Post.objects.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pull_authors)
+    ).annotate(feed_date=F('pub_date')).order_by('-feed_date')
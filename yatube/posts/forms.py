@@ -1,5 +1,9 @@
+import struct
+
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Comment, Post
 
 
@@ -11,6 +15,38 @@ class PostForm(forms.ModelForm):
         labels = {'text': ('текст'), 'group': ('группа')}
         help_texts = {'group': ('Выберите подходящую группу для поста')}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # файлы, отклонённые ещё при загрузке (uploads.ImageUploadHandler),
+        # полю формы не передаются: их ошибки добавляются в clean()
+        self.rejected = {
+            name: upload for name, upload in self.files.items()
+            if isinstance(upload, uploads.RejectedUpload)
+        }
+        if self.rejected:
+            self.files = self.files.copy()
+            for name in self.rejected:
+                del self.files[name]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, upload in self.rejected.items():
+            self.add_error(name, upload.error)
+        return cleaned_data
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile) and image.image.format == 'JPEG':
+            try:
+                orientation = uploads.read_header(image)[2]
+                image = uploads.strip_jpeg_metadata(image, orientation)
+            except (ValueError, struct.error) as exc:
+                raise forms.ValidationError(
+                    self.fields['image'].error_messages['invalid_image'],
+                    code='invalid_image',
+                ) from exc
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,141 @@
+"""
+Хештеги (#тег) и упоминания (@username) в текстах постов.
+
+Текст разбирается один раз, при сохранении поста: позиции ссылок
+хранятся в Post.text_spans и по ним строится HTML без повторного
+разбора, а связи пишутся в PostTag и Mention — по ним страницы тегов
+и упоминаний читаются диапазоном по индексу, без поиска по тексту.
+"""
+import json
+import re
+
+from django.db.models import F
+
+from .models import Mention, Post, PostTag, Tag, User
+
+HASHTAG_RE = re.compile(r'(?<![\w#&])#(\w{1,100})')
+# символы имени пользователя Django; точка или дефис в конце — уже
+# знак препинания, а не часть имени
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]{1,150})')
+MENTION_TRAILING = '.@+-'
+
+TAG, USER = 'tag', 'user'
+
+
+def find_mentions(text):
+    """(начало, конец, имя) для каждого @имени в тексте."""
+    for match in MENTION_RE.finditer(text):
+        name = match.group(1).rstrip(MENTION_TRAILING)
+        if name:
+            yield match.start(), match.start() + 1 + len(name), name
+
+
+def find_spans(text, usernames):
+    """
+    Ссылки в тексте: [[начало, конец, вид, цель], ...] по порядку.
+    Упоминания становятся ссылками, только если имя есть в usernames.
+    """
+    spans = [[match.start(), match.end(), TAG, match.group(1).lower()]
+             for match in HASHTAG_RE.finditer(text)]
+    spans.extend([start, end, USER, name]
+                 for start, end, name in find_mentions(text)
+                 if name in usernames)
+    return sorted(spans)
+
+
+def targets(spans, kind):
+    return list(dict.fromkeys(
+        target for _, _, span_kind, target in spans if span_kind == kind
+    ))
+
+
+def parse(post):
+    """Находит ссылки в тексте поста и записывает их в text_spans."""
+    parse_many([post])
+
+
+def parse_many(posts):
+    """parse() для пачки постов: имена упоминаний проверяются разом."""
+    names = {name for post in posts
+             for _, _, name in find_mentions(post.text)}
+    usernames = set(User.objects.filter(username__in=names).values_list(
+        'username', flat=True
+    )) if names else set()
+    for post in posts:
+        spans = find_spans(post.text, usernames)
+        post.text_spans = (json.dumps(spans, ensure_ascii=False) if spans
+                           else '')
+
+
+def save_links(post, created=False):
+    """Приводит связи PostTag и Mention поста в соответствие с текстом."""
+    spans = post.spans()
+    if created and not spans:
+        return
+    names = targets(spans, TAG)
+    Tag.objects.bulk_create(
+        (Tag(name=name) for name in names), ignore_conflicts=True
+    )
+    tag_ids = set(Tag.objects.filter(name__in=names).values_list(
+        'pk', flat=True
+    ))
+    # упоминать себя в своём посте — не повод для уведомления
+    user_ids = set(User.objects.filter(
+        username__in=targets(spans, USER)
+    ).exclude(pk=post.author_id).values_list('pk', flat=True))
+
+    PostTag.objects.filter(post=post).exclude(tag_id__in=tag_ids).delete()
+    PostTag.objects.bulk_create(
+        (PostTag(post=post, tag_id=tag_id, pub_date=post.pub_date)
+         for tag_id in tag_ids),
+        ignore_conflicts=True,
+    )
+    Mention.objects.filter(post=post).exclude(user_id__in=user_ids).delete()
+    Mention.objects.bulk_create(
+        (Mention(post=post, user_id=user_id, pub_date=post.pub_date)
+         for user_id in user_ids),
+        ignore_conflicts=True,
+    )
+
+
+def save_new_links(posts):
+    """save_links() для пачки новых постов: по запросу на вид связи."""
+    spans = {post.pk: post.spans() for post in posts}
+    names = {name for post_spans in spans.values()
+             for name in targets(post_spans, TAG)}
+    Tag.objects.bulk_create(
+        (Tag(name=name) for name in names), ignore_conflicts=True
+    )
+    tag_ids = dict(Tag.objects.filter(name__in=names).values_list(
+        'name', 'pk'
+    )) if names else {}
+    usernames = {name for post_spans in spans.values()
+                 for name in targets(post_spans, USER)}
+    user_ids = dict(User.objects.filter(username__in=usernames).values_list(
+        'username', 'pk'
+    )) if usernames else {}
+    PostTag.objects.bulk_create(
+        (PostTag(post=post, tag_id=tag_ids[name], pub_date=post.pub_date)
+         for post in posts for name in targets(spans[post.pk], TAG)),
+        ignore_conflicts=True,
+    )
+    Mention.objects.bulk_create(
+        (Mention(post=post, user_id=user_ids[name], pub_date=post.pub_date)
+         for post in posts for name in targets(spans[post.pk], USER)
+         if name in user_ids and user_ids[name] != post.author_id),
+        ignore_conflicts=True,
+    )
+
+
+def tagged(tag):
+    """Посты с тегом; дата, по которой упорядочена лента, — tag_date."""
+    return Post.objects.filter(tag_links__tag=tag).annotate(
+        tag_date=F('tag_links__pub_date')
+    )
+
+
+def mentioning(user):
+    """Посты, где упомянут пользователь; дата ленты — mention_date."""
+    return Post.objects.filter(mentions__user=user).annotate(
+        mention_date=F('mentions__pub_date')
+    )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.cache import page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и сбросы кеша страниц.'
+
+    def handle(self, *args, **options):
+        stats = page_cache_stats(('index_page', 'group_page', 'profile_page'))
+        for name, value in stats.items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.template.defaultfilters import filesizeformat
+
+from posts.cache import bump, post_scopes
+from posts.models import Post
+from posts.storage import image_storage, is_content_addressed
+
+# свежие файлы могут принадлежать загрузке, которая ещё не сохранилась
+ORPHAN_MIN_AGE = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов в хранилище с адресацией '
+            'по содержимому и удаляет файлы, на которые нет ссылок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, сколько места освободится.',
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        before = self.usage()
+        self.scopes = set()
+        moved = self.move_images() + self.move_derivatives()
+        # закешированные страницы ссылаются на старые, уже удалённые файлы
+        bump(*self.scopes)
+        removed = self.remove_orphans()
+        after = self.usage() if not self.dry_run else self.planned(before)
+
+        self.stdout.write(f'Перенесено файлов: {moved}')
+        self.stdout.write(f'Удалено файлов без ссылок: {removed}')
+        self.stdout.write(
+            f'Было: {before[0]} файлов, {filesizeformat(before[1])}; '
+            f'стало: {after[0]} файлов, {filesizeformat(after[1])}.'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Освобождено: {filesizeformat(before[1] - after[1])}.'
+        ))
+
+    def files(self):
+        root = image_storage.path('posts')
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, image_storage.location), path
+
+    def usage(self):
+        sizes = [os.path.getsize(path) for _, path in self.files()]
+        return len(sizes), sum(sizes)
+
+    def planned(self, before):
+        # без изменений на диске: сколько останется уникальных файлов
+        count, size = before
+        return count - self.saved_files, size - self.saved_bytes
+
+    def rename(self, name):
+        """Новое (хешевое) имя файла; без --dry-run файл переносится."""
+        with image_storage.open(name) as content:
+            if self.dry_run:
+                return image_storage.hashed_name(name, content)
+            return image_storage.save(name, content)
+
+    def move_images(self):
+        self.saved_files = self.saved_bytes = 0
+        self.targets = set()
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).distinct()
+        moved = 0
+        for name in list(names):
+            if is_content_addressed(name) or not image_storage.exists(name):
+                continue
+            new_name = self.move(name)
+            moved += 1
+            if not self.dry_run:
+                posts = Post.objects.filter(image=name)
+                self.expire(posts)
+                posts.update(image=new_name, version=F('version') + 1)
+        return moved
+
+    def expire(self, posts):
+        for post in posts.select_related('author', 'group'):
+            self.scopes.update(post_scopes(post))
+
+    def move(self, name):
+        """Переносит файл под хешевое имя и возвращает это имя."""
+        size = image_storage.size(name)
+        new_name = self.rename(name)
+        if new_name in self.targets or (
+            self.dry_run and image_storage.exists(new_name)
+        ):
+            # такое содержимое уже есть: копия не нужна
+            self.saved_files += 1
+            self.saved_bytes += size
+        self.targets.add(new_name)
+        if not self.dry_run:
+            image_storage.delete(name)
+        return new_name
+
+    def move_derivatives(self):
+        moved = 0
+        posts = Post.objects.exclude(image_derivatives='')
+        for post in posts.only('pk', 'image_derivatives').iterator():
+            derivatives = post.derivatives()
+            changed = False
+            for item in derivatives:
+                name = item['name']
+                if is_content_addressed(name) or not image_storage.exists(
+                    name
+                ):
+                    continue
+                item['name'] = self.move(name)
+                moved += 1
+                changed = True
+            if changed and not self.dry_run:
+                self.expire(Post.objects.filter(pk=post.pk))
+                Post.objects.filter(pk=post.pk).update(
+                    image_derivatives=json.dumps(derivatives),
+                    version=F('version') + 1,
+                )
+        return moved
+
+    def referenced(self):
+        names = set(Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True))
+        for value in Post.objects.exclude(image_derivatives='').values_list(
+            'image_derivatives', flat=True
+        ):
+            names.update(item['name'] for item in json.loads(value))
+        return names | self.targets
+
+    def remove_orphans(self):
+        referenced = self.referenced()
+        deadline = time.time() - ORPHAN_MIN_AGE
+        removed = 0
+        for name, path in list(self.files()):
+            if name in referenced or os.path.getmtime(path) > deadline:
+                continue
+            if self.dry_run:
+                # перенесённые в этом запуске файлы уже посчитаны
+                self.saved_files += 1
+                self.saved_bytes += os.path.getsize(path)
+            else:
+                image_storage.delete(name)
+            removed += 1
+        return removed
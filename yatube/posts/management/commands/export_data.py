@@ -0,0 +1,48 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии '
+            'или подписки в JSON Lines или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.KINDS))
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='Файл для записи; по умолчанию стандартный вывод.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='Формат; по умолчанию по расширению файла, иначе jsonl.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько записей читается из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        format = options['format'] or file_format(path)
+        started = time.monotonic()
+        records = transfer.rows(options['kind'], options['chunk_size'])
+        if path == '-':
+            count = transfer.write(options['kind'], records, self.stdout,
+                                   format)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                count = transfer.write(options['kind'], records, file,
+                                       format)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        # при выводе в stdout отчёт не должен попасть в данные
+        report = sys.stderr if path == '-' else self.stdout
+        report.write(f'{options["kind"]}: {count} за {elapsed:.1f} с, '
+                     f'{count / elapsed:.0f} в секунду\n')
+
+
+def file_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
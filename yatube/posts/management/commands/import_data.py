@@ -0,0 +1,89 @@
+import multiprocessing
+import sys
+import time
+
+from django import db
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters, feed, transfer
+
+from .export_data import file_format
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты, комментарии '
+            'или подписки из JSON Lines или CSV пачками через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(transfer.KINDS))
+        parser.add_argument(
+            'path', help='Файл с записями; «-» — стандартный ввод.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='Формат; по умолчанию по расширению файла, иначе jsonl.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей пишется в одной транзакции.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько процессов готовят пачки (HTML, ссылки, индекс).',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or file_format(path)
+        if path == '-':
+            count = self.load(sys.stdin, format, options)
+        else:
+            with open(path, encoding='utf-8', newline='') as file:
+                count = self.load(file, format, options)
+        self.stdout.write(self.style.SUCCESS(f'Загружено записей: {count}.'))
+
+    def load(self, file, format, options):
+        kind = options['kind']
+        tasks = ((kind, batch) for batch in transfer.batches(
+            transfer.read(file, format), options['batch_size']
+        ))
+        # пачки готовят процессы, пишет в базу только этот процесс:
+        # так SQLite не упирается в блокировку
+        pool = None
+        if options['workers'] > 1:
+            db.connections.close_all()
+            pool = multiprocessing.Pool(options['workers'])
+        prepared = (
+            transfer.imap_bounded(pool, transfer.prepare, tasks,
+                                  2 * options['workers'])
+            if pool else map(transfer.prepare, tasks)
+        )
+        started = time.monotonic()
+        count = 0
+        try:
+            for batch in prepared:
+                count += transfer.save(*batch)
+                if options['verbosity'] > 1:
+                    self.report(kind, count, started)
+        except (KeyError, ValueError, db.IntegrityError) as error:
+            raise CommandError(
+                f'Ошибка в пачке после {count} записей: {error!r}'
+            )
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        self.report(kind, count, started)
+
+        if kind in ('post', 'comment'):
+            transfer.reset_sequences(kind)
+        if kind in ('post', 'follow'):
+            feed.fill()
+        if kind != 'group':
+            counters.recount()
+        return count
+
+    def report(self, what, count, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f'{what}: {count} за {elapsed:.1f} с, '
+                          f'{count / elapsed:.0f} в секунду')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие копии картинок постов.'
+
+    def handle(self, *args, **options):
+        made = failed = 0
+        posts = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).filter(image_derivatives='').order_by('pk')
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            try:
+                thumbnails.generate(post_id)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Пост {post_id}: {error}')
+            else:
+                made += 1
+        self.stdout.write(f'Ошибок: {failed}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {made}.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        drift = counters.recount(fix=not options['check'])
+        for field, stale in drift.items():
+            self.stdout.write(f'{field}: {stale}')
+        if not options['check']:
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
+        elif any(drift.values()):
+            raise CommandError('Счётчики расходятся с данными.')
@@ -0,0 +1,102 @@
+import multiprocessing
+import time
+
+from django import db
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from posts import search
+from posts.models import SearchCheckpoint
+
+
+def chunk_documents(chunk):
+    return search.chunk_documents(*chunk)
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает поисковый индекс постов и комментариев '
+            'или, с --incremental, применяет журнал изменений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Только перенести в индекс изменения из журнала.',
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную переиндексацию с места остановки.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Сколько процессов разбирают текст на основы.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Диапазон pk, который читается и записывается за раз.',
+        )
+
+    def handle(self, *args, **options):
+        if not search.supported():
+            raise CommandError('Поиск не поддерживается этой СУБД.')
+        started = time.monotonic()
+        if options['incremental']:
+            applied = search.apply_changes()
+            self.report('изменений', applied, started)
+            return
+        # текст разбирают процессы, пишет в индекс только этот процесс:
+        # так SQLite не упирается в блокировку, а отметка о прогрессе
+        # сохраняется в одной транзакции с записанными строками
+        pool = None
+        if options['workers'] > 1:
+            db.connections.close_all()
+            pool = multiprocessing.Pool(options['workers'])
+        try:
+            for source in search.sources():
+                self.reindex(source, pool, options)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        removed = search.remove_stale()
+        SearchCheckpoint.objects.all().delete()
+        self.stdout.write(f'Удалено устаревших строк: {removed}')
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
+
+    def reindex(self, source, pool, options):
+        model = search.sources()[source][0]
+        bounds = model.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['last'] is None:
+            return
+        first = bounds['first']
+        checkpoint = SearchCheckpoint.objects.filter(source=source).first()
+        if options['resume'] and checkpoint is not None:
+            first = checkpoint.last_pk + 1
+        size = options['chunk_size']
+        chunks = [(source, start, start + size)
+                  for start in range(first, bounds['last'] + 1, size)]
+        results = (pool.imap(chunk_documents, chunks) if pool
+                   else map(chunk_documents, chunks))
+
+        started = time.monotonic()
+        written = 0
+        # imap отдаёт результаты по порядку, поэтому отметка о прогрессе
+        # означает, что все записи до неё уже в индексе
+        for (_, _, end), documents in zip(chunks, results):
+            with transaction.atomic():
+                search.store(documents)
+                SearchCheckpoint.objects.update_or_create(
+                    source=source, defaults={'last_pk': end - 1}
+                )
+            written += len(documents)
+            if options['verbosity'] > 1:
+                self.report(source, written, started, end - 1)
+        self.report(source, written, started)
+
+    def report(self, what, count, started, position=None):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        line = (f'{what}: {count} за {elapsed:.1f} с, '
+                f'{count / elapsed:.0f} в секунду')
+        if position is not None:
+            line += f', до pk {position}'
+        self.stdout.write(line)
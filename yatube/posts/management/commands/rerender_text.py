@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from posts import rendering
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает HTML текста постов и комментариев, '
+            'построенный прежней версией posts.rendering.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько записей перестраивается за раз.',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            count = self.rerender(model, options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count}')
+        self.stdout.write(self.style.SUCCESS('HTML текста перестроен.'))
+
+    def rerender(self, model, batch_size):
+        fields = ['text', 'text_spans'] if model is Post else ['text']
+        stale = rendering.stale(model).only(*fields).order_by('pk')
+        count = last = 0
+        while True:
+            batch = list(stale.filter(pk__gt=last)[:batch_size])
+            if not batch:
+                return count
+            for obj in batch:
+                rendering.prepare(obj)
+            model.objects.bulk_update(
+                batch, ['text_html', 'text_html_version']
+            )
+            if model is Post:
+                # карточки постов закешированы по версии поста
+                Post.objects.filter(pk__in=[post.pk for post in batch]).update(
+                    version=F('version') + 1
+                )
+            count += len(batch)
+            last = batch[-1].pk
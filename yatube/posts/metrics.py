@@ -0,0 +1,63 @@
+"""
+Счётчики событий, общие для всех процессов.
+
+Каждый процесс копит приращения у себя и переносит их в общий кеш
+не чаще раза в METRICS_FLUSH_INTERVAL секунд (и при выходе), а не
+записью в кеш на каждое событие. snapshot() сначала переносит
+приращения своего процесса; у остальных процессов в нём может не
+хватать событий за последний интервал.
+"""
+import atexit
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+
+PREFIX = 'metrics:'
+
+_pending = Counter()
+_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def flush_interval():
+    return getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+
+
+def incr(name, delta=1):
+    """Увеличивает счётчик name."""
+    with _lock:
+        _pending[name] += delta
+        due = time.monotonic() - _flushed_at >= flush_interval()
+    if due:
+        flush()
+
+
+def flush():
+    """Переносит накопленные приращения в общий кеш."""
+    global _flushed_at
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    for name, delta in pending.items():
+        _store(PREFIX + name, delta)
+
+
+def _store(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def snapshot(names):
+    flush()
+    values = cache.get_many([PREFIX + name for name in names])
+    return {name: values.get(PREFIX + name, 0) for name in names}
+
+
+atexit.register(flush)
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.6 on 2026-10-18 09:40
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    from posts import search
+
+    connection = schema_editor.connection
+    if not search.supported(connection):
+        return
+    search.create_table(connection)
+    search.rebuild(
+        apps.get_model('posts', 'Post'),
+        apps.get_model('posts', 'Comment'),
+        connection,
+    )
+
+
+def drop_index(apps, schema_editor):
+    from posts import search
+
+    if search.supported(schema_editor.connection):
+        search.drop_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 2.2.6 on 2026-10-18 06:44
+
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_links(apps, schema_editor):
+    from posts.links import TAG, USER, find_mentions, find_spans, targets
+
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    Mention = apps.get_model('posts', 'Mention')
+    posts = Post.objects.filter(
+        models.Q(text__contains='#') | models.Q(text__contains='@')
+    ).only('text', 'author', 'pub_date')
+    for post in posts.iterator():
+        names = {name for _, _, name in find_mentions(post.text)}
+        users = dict(User.objects.filter(username__in=names).values_list(
+            'username', 'pk'
+        ))
+        spans = find_spans(post.text, users)
+        if not spans:
+            continue
+        Post.objects.filter(pk=post.pk).update(
+            text_spans=json.dumps(spans, ensure_ascii=False)
+        )
+        for name in targets(spans, TAG):
+            tag, _ = Tag.objects.get_or_create(name=name)
+            PostTag.objects.get_or_create(
+                tag=tag, post=post, defaults={'pub_date': post.pub_date}
+            )
+        for name in targets(spans, USER):
+            if users[name] != post.author_id:
+                Mention.objects.get_or_create(
+                    user_id=users[name], post=post,
+                    defaults={'pub_date': post.pub_date},
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_search_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_spans',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='posts.Post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='posts.Tag')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Mention',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mentions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-pub_date'], name='posts_postt_tag_id_422b52_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='posttag',
+            unique_together={('tag', 'post')},
+        ),
+        migrations.AddIndex(
+            model_name='mention',
+            index=models.Index(fields=['user', '-pub_date'], name='posts_menti_user_id_b85441_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='mention',
+            unique_together={('user', 'post')},
+        ),
+        migrations.RunPython(fill_links, migrations.RunPython.noop),
+    ]
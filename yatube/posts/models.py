@@ -1,6 +1,10 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import image_storage
+
 User = get_user_model()
 
 
@@ -14,6 +18,12 @@ class Group(models.Model):
         return self.title[:15]
 
 
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Всё, что нужно карточке поста, одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField("date published", auto_now_add=True)
@@ -21,14 +31,60 @@ class Post(models.Model):
                                related_name="posts")
     group = models.ForeignKey(Group, on_delete=models.SET_NULL,
                               blank=True, null=True, related_name="posts")
-    image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    # одинаковые картинки хранятся одним файлом, см. posts.storage
+    image = models.ImageField(upload_to="posts/", storage=image_storage,
+                              blank=True, null=True)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    # меняется при каждом изменении поста или его комментариев;
+    # входит в ключ кеша карточки поста
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # уменьшенные копии картинки для srcset (JSON), заполняет
+    # posts.thumbnails; по ним карточка строится без обращения к файлам
+    image_derivatives = models.TextField(default='', editable=False)
+    # позиции хештегов и упоминаний в тексте (JSON), заполняет
+    # posts.links при сохранении; по ним текст выводится со ссылками
+    text_spans = models.TextField(default='', editable=False)
+    # готовый HTML текста и версия кода, который его построил,
+    # см. posts.rendering
+    text_html = models.TextField(default='', editable=False)
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
+        # под выборки лент: вся лента, лента группы, лента автора
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"],
+                         name="post_pub_date_idx"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_pub_date_idx"),
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_pub_date_idx"),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def derivatives(self):
+        """Копии картинки: [{name, format, width, height, size}, ...]."""
+        if not self.image_derivatives:
+            return []
+        return json.loads(self.image_derivatives)
+
+    def spans(self):
+        """Ссылки в тексте: [[начало, конец, 'tag'|'user', цель], ...]."""
+        if not self.text_spans:
+            return []
+        return json.loads(self.text_spans)
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            self.version += 1
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -39,6 +95,17 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField("date published", auto_now_add=True)
+    text_html = models.TextField(default='', editable=False)
+    text_html_version = models.PositiveSmallIntegerField(
+        default=0, editable=False
+    )
+
+    class Meta:
+        ordering = ["created", "id"]
+        indexes = [
+            models.Index(fields=["post", "created", "id"],
+                         name="comment_post_created_idx"),
+        ]
 
     def __str__(self):
         return self.text
@@ -51,3 +118,95 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="following"
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"],
+                                    name="unique_follow"),
+        ]
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="feed"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="feed_items"
+    )
+    # копия Post.pub_date, чтобы лента читалась по индексу (user, pub_date)
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        unique_together = ("user", "post")
+        indexes = [models.Index(fields=["user", "-pub_date"])]
+
+
+class Tag(models.Model):
+    # имя без «#», в нижнем регистре
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+class PostTag(models.Model):
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name="post_links"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="tag_links"
+    )
+    # копия Post.pub_date, чтобы страница тега читалась по индексу
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("tag", "post")
+        indexes = [models.Index(fields=["tag", "-pub_date"])]
+
+
+class Mention(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="mentions"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="mentions"
+    )
+    # копия Post.pub_date, чтобы упоминания читались по индексу
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("user", "post")
+        indexes = [models.Index(fields=["user", "-pub_date"])]
+
+
+class PullAuthor(models.Model):
+    # посты авторов с большим числом подписчиков не раскладываются
+    # по лентам, а подмешиваются в ленту при чтении
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="pull_author"
+    )
+
+
+class UserStats(models.Model):
+    # счётчики обновляются signals.py вместе с записью, которую считают;
+    # расхождения исправляет команда recount
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name="stats"
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+
+class SearchChange(models.Model):
+    # журнал изменений для отложенной индексации (SEARCH_INDEX_DEFERRED):
+    # ключ строки поискового индекса, см. posts.search
+    key = models.BigIntegerField()
+
+
+class SearchCheckpoint(models.Model):
+    # до какого pk дошла прерванная переиндексация, см. reindex_search
+    source = models.CharField(max_length=20, unique=True)
+    last_pk = models.BigIntegerField()
@@ -0,0 +1,101 @@
+import base64
+import json
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(date, pk, backwards=False):
+    raw = json.dumps([int(backwards), date.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (backwards, date, pk) или None для битого курсора."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        backwards, date, pk = json.loads(raw.decode())
+        date = parse_datetime(date)
+    except (TypeError, ValueError):
+        return None
+    if date is None or not isinstance(pk, int):
+        return None
+    return bool(backwards), date, pk
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинация по ключу (date_field, id).
+
+    Страница выбирается диапазоном по индексу, без COUNT(*) и OFFSET,
+    поэтому время ответа не зависит от глубины страницы. Общее число
+    записей считается только по запросу и кешируется (count_key).
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 count_key=None, count_timeout=300):
+        super().__init__(
+            object_list.order_by(f'-{date_field}', '-id'), per_page
+        )
+        self.date_field = date_field
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor)
+        limit = self.per_page + 1
+        has_previous = has_next = False
+        if position is None:
+            items = list(self.object_list[:limit])
+            has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+        else:
+            backwards, date, pk = position
+            if backwards:
+                items = list(self._after(date, pk).reverse()[:limit])
+                has_previous = len(items) > self.per_page
+                items = items[:self.per_page][::-1]
+                has_next = True
+            else:
+                items = list(self._before(date, pk)[:limit])
+                has_next = len(items) > self.per_page
+                items = items[:self.per_page]
+                has_previous = True
+        page = Page(items, 1, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if items and has_next:
+            page.next_cursor = self._cursor(items[-1])
+        if items and has_previous:
+            page.previous_cursor = self._cursor(items[0], backwards=True)
+        return page
+
+    def approximate_count(self):
+        if self.count_key is None:
+            return None
+        return cache.get_or_set(
+            self.count_key, self.object_list.count, self.count_timeout
+        )
+
+    # Условие на одну дату (lte/gte) дублирует составное, но позволяет
+    # базе начать чтение индекса сразу с нужного места.
+    def _before(self, date, pk):
+        return self.object_list.filter(
+            Q(**{f'{self.date_field}__lte': date}),
+            Q(**{f'{self.date_field}__lt': date}) | Q(id__lt=pk),
+        )
+
+    def _after(self, date, pk):
+        return self.object_list.filter(
+            Q(**{f'{self.date_field}__gte': date}),
+            Q(**{f'{self.date_field}__gt': date}) | Q(id__gt=pk),
+        )
+
+    def _cursor(self, obj, backwards=False):
+        return encode_cursor(
+            getattr(obj, self.date_field), obj.pk, backwards=backwards
+        )
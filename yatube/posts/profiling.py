@@ -0,0 +1,158 @@
+"""
+Профилирование запросов.
+
+ProfilingMiddleware для доли запросов PROFILING_SAMPLE_RATE собирает
+имя view, число и время SQL-запросов, время отрисовки шаблонов,
+попадания и промахи кеша страниц и карточек.
+Итог пишется одной JSON-строкой в лог posts.profiling и в заголовок
+Server-Timing ответа.
+
+Данные запроса лежат в ContextVar: точки замера (timed, cache_lookup)
+для запросов вне выборки обходятся одним current.get(). При нулевой
+доле middleware отключается целиком.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+current = ContextVar('profile', default=None)
+
+TIMINGS = ('db', 'render')
+
+
+class Profile:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = dict.fromkeys(TIMINGS, 0.0)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # открытые замеры: вложенные вызовы не считаются дважды
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка запросов к базе, см. connection.execute_wrapper()."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.timings['db'] += time.perf_counter() - start
+
+    def record(self, request, response, elapsed):
+        match = request.resolver_match
+        record = {
+            'view': match.func.__name__ if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': elapsed * 1000,
+            'db_queries': self.queries,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+        for name, seconds in self.timings.items():
+            record[f'{name}_ms'] = seconds * 1000
+        return {key: round(value, 2) if isinstance(value, float) else value
+                for key, value in record.items()}
+
+
+def timed(name):
+    """Декоратор: время вызовов попадает в замер name текущего запроса."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = current.get()
+            if profile is None or name in profile.active:
+                return func(*args, **kwargs)
+            profile.active.add(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.timings[name] += time.perf_counter() - start
+                profile.active.discard(name)
+        return wrapper
+    return decorator
+
+
+def cache_lookup(hits=0, misses=0):
+    """Учитывает попадания и промахи кеша в текущем запросе."""
+    profile = current.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+def server_timing(record):
+    return ', '.join([
+        f'total;dur={record["total_ms"]}',
+        f'db;dur={record["db_ms"]};desc="{record["db_queries"]} SQL"',
+        f'render;dur={record["render_ms"]}',
+        f'cache;desc="hit {record["cache_hits"]}, '
+        f'miss {record["cache_misses"]}"',
+    ])
+
+
+class ProfilingMiddleware:
+    """Профилирует случайную выборку запросов, см. описание модуля."""
+
+    def __init__(self, get_response):
+        self.rate = settings.PROFILING_SAMPLE_RATE
+        if self.rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= self.rate:
+            return self.get_response(request)
+
+        profile = Profile()
+        token = current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        record = profile.record(
+            request, response, time.perf_counter() - start
+        )
+        logger.info(json.dumps(record, ensure_ascii=False),
+                    extra={'profile': record})
+        response['Server-Timing'] = server_timing(record)
+        return response
+
+
+class Template(django_backend.Template):
+    @timed('render')
+    def render(self, context=None, request=None):
+        return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в профиль."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
@@ -0,0 +1,54 @@
+"""
+HTML текста постов и комментариев.
+
+HTML (экранированный текст с <br> и ссылками на теги и авторов)
+строится при сохранении записи и хранится в text_html, шаблоны выводят
+его как есть. При изменении того, как строится HTML, нужно увеличить
+VERSION: записи со старой версией выводятся через render() на лету,
+пока их не перестроит python manage.py rerender_text.
+"""
+from django.template.defaultfilters import linebreaksbr
+from django.urls import reverse
+from django.utils.html import escape, format_html
+from django.utils.safestring import mark_safe
+
+from . import links
+
+VERSION = 1
+
+URLS = {links.TAG: 'tag_posts', links.USER: 'profile'}
+
+
+def render(obj):
+    """HTML текста поста или комментария."""
+    text = obj.text
+    parts = []
+    position = 0
+    # у комментариев ссылок нет
+    spans = obj.spans() if hasattr(obj, 'spans') else ()
+    for start, end, kind, target in spans:
+        parts.append(escape(text[position:start]))
+        parts.append(format_html(
+            '<a href="{}">{}</a>',
+            reverse(URLS[kind], args=[target]), text[start:end],
+        ))
+        position = end
+    parts.append(escape(text[position:]))
+    return linebreaksbr(mark_safe(''.join(parts)))
+
+
+def prepare(obj):
+    """Сохраняет HTML текста в записи перед её сохранением."""
+    obj.text_html = render(obj)
+    obj.text_html_version = VERSION
+
+
+def html(obj):
+    """HTML для шаблона: сохранённый, если он построен текущей версией."""
+    if obj.text_html_version == VERSION:
+        return mark_safe(obj.text_html)
+    return render(obj)
+
+
+def stale(model):
+    return model.objects.exclude(text_html_version=VERSION)
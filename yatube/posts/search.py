@@ -0,0 +1,457 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Индекс — отдельная таблица posts_search: в SQLite это виртуальная
+таблица FTS5, в PostgreSQL — столбец tsvector с GIN-индексом. В индекс
+пишутся не слова, а их основы (stem): русская морфология не входит
+ни в FTS5, ни в конфигурацию 'simple', поэтому основы считаются здесь,
+одинаково для документов, запросов и подсветки. Строка индекса
+адресуется ключом: 2 * id для поста, 2 * id + 1 для комментария.
+Индекс обновляют сигналы при сохранении и удалении записей.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+TABLE = 'posts_search'
+# сколько постов выдаёт поиск, дальше результаты не листаются
+LIMIT = 500
+SNIPPET_WORDS = 30
+# строк индекса в одном запросе записи
+BATCH_SIZE = 500
+
+WORD_RE = re.compile(r'\w+')
+
+# алгоритм Портера для русского языка
+RV_RE = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND_RE = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE_RE = re.compile(r'(с[яь])$')
+ADJECTIVE_RE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE_RE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB_RE = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)'
+    r'|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN_RE = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL_RE = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_SUFFIX_RE = re.compile(r'ость?$')
+SUPERLATIVE_RE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    """
+    Основа слова. Слова не на кириллице только приводятся
+    к нижнему регистру.
+    """
+    word = word.lower().replace('ё', 'е')
+    match = RV_RE.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    without = PERFECTIVE_GERUND_RE.sub('', rv, 1)
+    if without != rv:
+        rv = without
+    else:
+        rv = REFLEXIVE_RE.sub('', rv, 1)
+        without = ADJECTIVE_RE.sub('', rv, 1)
+        if without != rv:
+            rv = PARTICIPLE_RE.sub('', without, 1)
+        else:
+            without = VERB_RE.sub('', rv, 1)
+            rv = NOUN_RE.sub('', rv, 1) if without == rv else without
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL_RE.match(rv):
+        rv = DERIVATIONAL_SUFFIX_RE.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE_RE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def stems(text):
+    return [stem(word) for word in WORD_RE.findall(text)]
+
+
+def query_stems(query):
+    # порядок сохраняется, повторы не нужны
+    return list(dict.fromkeys(stem for stem in stems(query) if stem))
+
+
+def post_key(post_id):
+    return 2 * post_id
+
+
+def comment_key(comment_id):
+    return 2 * comment_id + 1
+
+
+def supported(using=None):
+    return (using or connection).vendor in ('sqlite', 'postgresql')
+
+
+# SQL для каждой СУБД: создание таблицы, запись, поиск
+
+SCHEMA = {
+    'sqlite': [
+        f'CREATE VIRTUAL TABLE {TABLE} USING fts5('
+        f'document, post_id UNINDEXED, tokenize=\'unicode61\')',
+    ],
+    'postgresql': [
+        f'CREATE TABLE {TABLE} (id bigint PRIMARY KEY, '
+        f'post_id integer NOT NULL, document tsvector NOT NULL)',
+        f'CREATE INDEX {TABLE}_document ON {TABLE} USING GIN (document)',
+        f'CREATE INDEX {TABLE}_post_id ON {TABLE} (post_id)',
+    ],
+}
+
+DROP = f'DROP TABLE IF EXISTS {TABLE}'
+
+DELETE = f'DELETE FROM {TABLE} WHERE {{key}} IN ({{keys}})'
+
+INSERT = {
+    'sqlite': f'INSERT INTO {TABLE} (rowid, document, post_id) '
+              f'VALUES (%s, %s, %s)',
+    'postgresql': f"INSERT INTO {TABLE} (id, document, post_id) "
+                  f"VALUES (%s, to_tsvector('simple', %s), %s) "
+                  f"ON CONFLICT (id) DO UPDATE SET "
+                  f"document = EXCLUDED.document, post_id = EXCLUDED.post_id",
+}
+
+KEY = {'sqlite': 'rowid', 'postgresql': 'id'}
+
+# результаты — посты, упорядоченные по лучшему совпадению в посте
+# или в его комментариях; в FTS5 rank — это bm25 (меньше — лучше)
+RANKED = {
+    'sqlite': f'SELECT post_id, MIN(rank) AS score FROM {TABLE} '
+              f'WHERE {TABLE} MATCH %s '
+              f'GROUP BY post_id ORDER BY score LIMIT %s',
+    'postgresql': f"SELECT post_id, MAX(ts_rank_cd(document, query)) AS score "
+                  f"FROM {TABLE}, to_tsquery('simple', %s) query "
+                  f"WHERE document @@ query "
+                  f"GROUP BY post_id ORDER BY score DESC LIMIT %s",
+}
+
+MATCHING = {
+    'sqlite': f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s {{where}}',
+    'postgresql': f"SELECT id FROM {TABLE} "
+                  f"WHERE document @@ to_tsquery('simple', %s) {{where}}",
+}
+
+
+def match_expression(vendor, words):
+    """Все основы запроса, каждая как префикс."""
+    if vendor == 'sqlite':
+        return ' '.join(f'"{word}"*' for word in words)
+    return ' & '.join(f"'{word}':*" for word in words)
+
+
+def documents(rows):
+    """Строки индекса с основами слов вместо текста."""
+    return [(key, ' '.join(stems(text)), post_id)
+            for key, text, post_id in rows]
+
+
+def write(rows, using=None):
+    """Записывает строки индекса [(key, text, post_id), ...]."""
+    store(documents(rows), using)
+
+
+def store(documents, using=None):
+    """Записывает готовые строки индекса [(key, основы, post_id), ...]."""
+    using = using or connection
+    vendor = using.vendor
+    if not documents or not supported(using):
+        return
+    with using.cursor() as cursor:
+        for start in range(0, len(documents), BATCH_SIZE):
+            batch = documents[start:start + BATCH_SIZE]
+            if vendor == 'sqlite':
+                # у FTS5 нет UPSERT: старая строка удаляется по rowid
+                cursor.execute(*delete_sql(vendor, [key for key, *_ in batch]))
+            cursor.executemany(INSERT[vendor], batch)
+
+
+def delete_sql(vendor, keys):
+    placeholders = ', '.join(['%s'] * len(keys))
+    return DELETE.format(key=KEY[vendor], keys=placeholders), keys
+
+
+def remove(keys, using=None):
+    using = using or connection
+    keys = list(keys)
+    if not keys or not supported(using):
+        return
+    with using.cursor() as cursor:
+        for start in range(0, len(keys), BATCH_SIZE):
+            cursor.execute(
+                *delete_sql(using.vendor, keys[start:start + BATCH_SIZE])
+            )
+
+
+def deferred():
+    return getattr(settings, 'SEARCH_INDEX_DEFERRED', False)
+
+
+def changed(key, row):
+    """
+    Обновляет строку индекса сразу или, если индексация отложена,
+    только записывает ключ в журнал SearchChange.
+    """
+    from .models import SearchChange
+
+    if deferred():
+        SearchChange.objects.create(key=key)
+    elif row is None:
+        remove([key])
+    else:
+        write([row])
+
+
+def index_post(post):
+    key = post_key(post.pk)
+    changed(key, (key, post.text, post.pk))
+
+
+def index_comment(comment):
+    key = comment_key(comment.pk)
+    changed(key, (key, comment.text, comment.post_id))
+
+
+def unindex_post(post_id):
+    changed(post_key(post_id), None)
+
+
+def unindex_comment(comment_id):
+    changed(comment_key(comment_id), None)
+
+
+def sources():
+    """Что индексируется: имя -> (модель, поле с id поста, ключ)."""
+    from .models import Comment, Post
+
+    return {
+        'post': (Post, 'pk', post_key),
+        'comment': (Comment, 'post_id', comment_key),
+    }
+
+
+def chunk_documents(source, start, end):
+    """Строки индекса для записей source с pk в [start, end)."""
+    model, post_field, key = sources()[source]
+    rows = model.objects.filter(pk__gte=start, pk__lt=end).order_by(
+        'pk'
+    ).values_list('pk', 'text', post_field)
+    return documents(
+        (key(pk), text, post_id) for pk, text, post_id in rows.iterator()
+    )
+
+
+def apply_changes(limit=BATCH_SIZE):
+    """
+    Переносит в индекс изменения из журнала SearchChange пачками
+    по limit ключей. Возвращает число применённых записей журнала.
+    """
+    from .models import SearchChange
+
+    applied = 0
+    while True:
+        with transaction.atomic():
+            changes = list(SearchChange.objects.order_by('id').values_list(
+                'id', 'key'
+            )[:limit])
+            if not changes:
+                return applied
+            keys = {key for _, key in changes}
+            rows = []
+            for model, post_field, key in sources().values():
+                ids = [k // 2 for k in keys if key(k // 2) == k]
+                rows.extend(
+                    (key(pk), text, post_id)
+                    for pk, text, post_id in model.objects.filter(
+                        pk__in=ids
+                    ).values_list('pk', 'text', post_field)
+                )
+            write(rows)
+            # записей, которых больше нет, в индексе тоже быть не должно
+            remove(keys - {key for key, *_ in rows})
+            SearchChange.objects.filter(id__lte=changes[-1][0]).delete()
+        applied += len(changes)
+
+
+def remove_stale():
+    """Удаляет из индекса строки записей, которых больше нет."""
+    if not supported():
+        return 0
+    vendor = connection.vendor
+    removed = 0
+    with connection.cursor() as cursor:
+        for model, post_field, key in sources().values():
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE {KEY[vendor]} %% 2 = %s '
+                f'AND {KEY[vendor]} / 2 NOT IN '
+                f'(SELECT id FROM {model._meta.db_table})',
+                [key(0)],
+            )
+            removed += cursor.rowcount
+    return removed
+
+
+def kind_filter(vendor, kind):
+    """Условие на ключ: только посты или только комментарии."""
+    if kind is None:
+        return ''
+    remainder = 0 if kind == 'post' else 1
+    return f'AND {KEY[vendor]} %% 2 = {remainder} '
+
+
+def ranked_post_ids(query, limit=LIMIT):
+    """
+    id постов, в тексте которых или в одном из комментариев есть все
+    слова запроса, от лучшего совпадения к худшему.
+    """
+    from .models import Post
+
+    words = query_stems(query)
+    if not words:
+        return []
+    vendor = connection.vendor
+    if not supported():
+        posts = Post.objects.all()
+        for word in WORD_RE.findall(query):
+            posts = posts.filter(text__icontains=word)
+        return list(posts.values_list('pk', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RANKED[vendor], [match_expression(vendor, words), limit]
+        )
+        return [post_id for post_id, _ in cursor.fetchall()]
+
+
+def matching_keys(query, kind=None, post_ids=None):
+    """Ключи строк индекса, подходящих под запрос."""
+    words = query_stems(query)
+    if not words or not supported():
+        return []
+    vendor = connection.vendor
+    where = kind_filter(vendor, kind)
+    params = [match_expression(vendor, words)]
+    if post_ids is not None:
+        if not post_ids:
+            return []
+        where += f'AND post_id IN ({", ".join(["%s"] * len(post_ids))}) '
+        params.extend(post_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(MATCHING[vendor].format(where=where), params)
+        return [key for key, in cursor.fetchall()]
+
+
+def post_ids(query):
+    """id постов, в тексте которых есть все слова запроса."""
+    return [key // 2 for key in matching_keys(query, kind='post')]
+
+
+def comment_ids(query):
+    return [key // 2 for key in matching_keys(query, kind='comment')]
+
+
+def highlight(text, query, words=SNIPPET_WORDS):
+    """
+    Фрагмент текста вокруг первого совпадения, совпавшие слова
+    выделены <mark>. None, если совпадений в тексте нет.
+    """
+    wanted = query_stems(query)
+    tokens = list(WORD_RE.finditer(text))
+    found = [i for i, token in enumerate(tokens)
+             if stem(token.group()).startswith(tuple(wanted))]
+    if not wanted or not found:
+        return None
+    first = max(found[0] - words // 3, 0)
+    last = min(first + words, len(tokens)) - 1
+    start = tokens[first].start() if first else 0
+    end = tokens[last].end() if last < len(tokens) - 1 else len(text)
+    parts = ['…'] if start else []
+    position = start
+    for i in found:
+        if i < first or i > last:
+            continue
+        token = tokens[i]
+        parts.append(escape(text[position:token.start()]))
+        parts.append(f'<mark>{escape(token.group())}</mark>')
+        position = token.end()
+    parts.append(escape(text[position:end]))
+    if end < len(text):
+        parts.append('…')
+    return mark_safe(''.join(parts))
+
+
+def add_snippets(posts, query):
+    """
+    Проставляет постам snippet: фрагмент текста поста или, если слова
+    нашлись только в комментариях, фрагмент первого такого комментария.
+    """
+    from .models import Comment
+
+    missing = {}
+    for post in posts:
+        post.snippet = highlight(post.text, query)
+        if post.snippet is None:
+            missing[post.pk] = post
+    if not missing:
+        return
+    keys = matching_keys(query, kind='comment', post_ids=list(missing))
+    comments = Comment.objects.select_related('author').filter(
+        pk__in=[key // 2 for key in keys]
+    ).order_by('created', 'id')
+    for comment in comments:
+        post = missing.pop(comment.post_id, None)
+        if post is not None:
+            post.snippet = highlight(comment.text, query)
+            post.snippet_comment = comment
+
+
+def create_table(using):
+    with using.cursor() as cursor:
+        for statement in SCHEMA[using.vendor]:
+            cursor.execute(statement)
+
+
+def drop_table(using):
+    with using.cursor() as cursor:
+        cursor.execute(DROP)
+
+
+def rebuild(Post, Comment, using=None, batch_size=500):
+    """Заполняет индекс заново по всем постам и комментариям."""
+    using = using or connection
+    if not supported(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    sources = (
+        (Post.objects.values_list('pk', 'text', 'pk'), post_key),
+        (Comment.objects.values_list('pk', 'text', 'post_id'), comment_key),
+    )
+    for rows, key in sources:
+        batch = []
+        for pk, text, post_id in rows.order_by('pk').iterator():
+            batch.append((key(pk), text, post_id))
+            if len(batch) == batch_size:
+                write(batch, using)
+                batch = []
+        write(batch, using)
@@ -0,0 +1,176 @@
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import counters, feed, links, rendering, search
+from .cache import bump, post_scopes, posts_scopes
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+# поля автора и группы, которые выводит карточка поста
+USER_CARD_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_CARD_FIELDS = ('slug', 'title')
+
+
+def expire_posts(posts, *scopes):
+    """
+    Меняет версию постов запроса posts, чтобы их карточки собрались
+    заново, и сбрасывает страницы, где эти посты выводятся.
+    """
+    bump(*posts_scopes(posts), *scopes)
+    posts.update(version=F('version') + 1)
+
+
+def remember_card_fields(instance, fields, update_fields):
+    """
+    Запоминает в instance._card_fields прежние значения полей fields,
+    если при сохранении они меняются.
+    """
+    instance._card_fields = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return
+    old = type(instance).objects.filter(pk=instance.pk).values(
+        *fields
+    ).first()
+    if old is not None and any(
+        old[field] != getattr(instance, field) for field in fields
+    ):
+        instance._card_fields = old
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields=None, **kwargs):
+    remember_card_fields(instance, USER_CARD_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def expire_user_posts(sender, instance, **kwargs):
+    old = getattr(instance, '_card_fields', None)
+    if old is not None:
+        # профиль под прежним username тоже устарел
+        expire_posts(Post.objects.filter(author=instance),
+                     f'author:{old["username"]}',
+                     f'author:{instance.username}')
+
+
+@receiver(pre_save, sender=Post)
+def prepare_post_text(sender, instance, **kwargs):
+    links.parse(instance)
+    rendering.prepare(instance)
+
+
+@receiver(pre_save, sender=Comment)
+def prepare_comment_text(sender, instance, **kwargs):
+    rendering.prepare(instance)
+
+
+@receiver(pre_save, sender=Post)
+def expire_old_pages(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old = Post.objects.select_related('author', 'group').filter(
+        pk=instance.pk
+    ).first()
+    if old is None:
+        return
+    # при смене группы страница прежней группы тоже устаревает
+    if old.group_id != instance.group_id:
+        bump(*post_scopes(old))
+    # копии прежней картинки новой не подходят
+    if old.image != instance.image:
+        instance.image_derivatives = ''
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        feed.fan_out(instance)
+    links.save_links(instance, created)
+    search.index_post(instance)
+    bump(*post_scopes(instance))
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    search.unindex_post(instance.pk)
+    bump(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    search.index_comment(instance)
+    if created:
+        counters.change_post(instance.post_id, 'comments_count', 1)
+    else:
+        # правка комментария меняет страницу поста и ETag его версии
+        Post.objects.filter(pk=instance.post_id).update(
+            version=F('version') + 1
+        )
+    bump(*post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def forget_comment(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, 'comments_count', -1)
+    search.unindex_comment(instance.pk)
+    bump(*post_scopes(instance.post))
+
+
+@receiver(post_save, sender=Follow)
+def fill_feed(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.user_id, 'following_count', 1)
+        counters.change_user(instance.author_id, 'followers_count', 1)
+        feed.subscribe(instance.user_id, instance.author_id)
+        bump(*follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed(sender, instance, **kwargs):
+    counters.change_user(instance.user_id, 'following_count', -1)
+    counters.change_user(instance.author_id, 'followers_count', -1)
+    feed.unsubscribe(instance.user_id, instance.author_id)
+    bump(*follow_scopes(instance))
+
+
+def follow_scopes(follow):
+    # на странице профиля видны числа подписчиков и подписок
+    return (f'author:{follow.user.username}',
+            f'author:{follow.author.username}')
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_title(sender, instance, update_fields=None, **kwargs):
+    remember_card_fields(instance, GROUP_CARD_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Group)
+def expire_group_page(sender, instance, **kwargs):
+    # 'groups' — список групп в API; посты группы видны ещё на главной
+    # и в профилях авторов
+    posts = Post.objects.filter(group=instance)
+    old = getattr(instance, '_card_fields', None)
+    if old is not None:
+        expire_posts(posts, f'group:{old["slug"]}', 'groups')
+    else:
+        bump(*posts_scopes(posts), f'group:{instance.slug}', 'groups')
+
+
+@receiver(pre_delete, sender=Group)
+def forget_group(sender, instance, **kwargs):
+    # до удаления: потом у постов group уже NULL и их областей не найти;
+    # удаление идёт в транзакции, bump() повторится после фиксации
+    expire_posts(Post.objects.filter(group=instance),
+                 f'group:{instance.slug}', 'groups')
@@ -0,0 +1,77 @@
+"""
+Хранилище картинок постов с адресацией по содержимому.
+
+Файл сохраняется под именем из SHA-256 содержимого:
+posts/<2 символа хеша>/<хеш>.<расширение>. Одинаковые картинки
+занимают один файл, и копии для srcset у них тоже общие. Отдельного
+счётчика ссылок нет: ссылки на файл — это посты с такой картинкой.
+Файлы, на которые не ссылается ни один пост, удаляет команда
+dedupe_media, а не удаление поста: проверка «ссылок больше нет»
+и удаление не атомарны, и параллельная загрузка той же картинки
+осталась бы без файла.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def is_content_addressed(name):
+    return bool(name) and HASHED_NAME_RE.search(name) is not None
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, в котором имя файла — хеш его содержимого."""
+
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = content_hash(content)
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def get_available_name(self, name, max_length=None):
+        # одно имя — одно содержимое: файл не переименовывается
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            # свежая отметка времени защищает файл от удаления
+            # dedupe_media, пока пост с ним ещё не сохранён
+            os.utime(full_path)
+            return name
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # пишем во временный файл рядом и переименовываем: два процесса
+        # с одной картинкой запишут одно и то же, переименование атомарно
+        descriptor, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as destination:
+                for chunk in content.chunks():
+                    destination.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, full_path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return name
+
+
+image_storage = ContentAddressedStorage()
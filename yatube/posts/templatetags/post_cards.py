@@ -0,0 +1,72 @@
+from django import template
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.utils.safestring import mark_safe
+
+from .. import profiling
+from ..cache import card_key
+
+register = template.Library()
+
+# как у {% cache 86400 post_card ... %} в includes/post_item.html
+CARD_TIMEOUT = 86400
+
+CARD_OPEN = '<div class="card mb-3 mt-1 shadow-sm">\n'
+CARD_CLOSE = '</div>\n'
+
+
+def fragment_cache():
+    """Кеш фрагментов, который использует тег {% cache %}."""
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, after=None):
+    """
+    Карточки постов страницы, то же, что includes/post_item.html в цикле.
+
+    Закешированные карточки читаются одним get_many по ключам тега
+    {% cache %}, недостающие рендерятся один раз загруженным шаблоном и
+    сохраняются одним set_many. after — шаблон, выводимый после каждой
+    карточки (с post в контексте).
+    """
+    posts = list(posts)
+    engine = context.template.engine
+    extra = engine.get_template(after) if after else None
+    if not settings.POST_CARDS_BATCHED:
+        item = engine.get_template('includes/post_item.html')
+        return mark_safe(''.join(
+            render(item, context, post) + render(extra, context, post)
+            for post in posts
+        ))
+
+    card = engine.get_template('includes/post_card.html')
+    footer = engine.get_template('includes/post_footer.html')
+    fragments = fragment_cache()
+    keys = {post.pk: card_key(post) for post in posts}
+    cached = fragments.get_many(keys.values())
+    missing = {}
+    parts = []
+    for post in posts:
+        key = keys[post.pk]
+        if key not in cached:
+            cached[key] = missing[key] = render(card, context, post)
+        parts += [
+            CARD_OPEN, cached[key], render(footer, context, post),
+            CARD_CLOSE, render(extra, context, post),
+        ]
+    profiling.cache_lookup(hits=len(posts) - len(missing),
+                           misses=len(missing))
+    if missing:
+        fragments.set_many(missing, CARD_TIMEOUT)
+    return mark_safe(''.join(parts))
+
+
+def render(compiled, context, post):
+    if compiled is None:
+        return ''
+    with context.push(post=post):
+        return compiled.render(context)
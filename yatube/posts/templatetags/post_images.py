@@ -0,0 +1,53 @@
+from django import template
+
+from .. import thumbnails
+
+register = template.Library()
+
+# карточка занимает всю ширину колонки, но не шире 960px
+CARD_SIZES = (f'(max-width: {thumbnails.CARD_WIDTH}px) 100vw, '
+              f'{thumbnails.CARD_WIDTH}px')
+
+
+def srcset(storage, derivatives):
+    return ', '.join(
+        f'{storage.url(item["name"])} {item["width"]}w'
+        for item in derivatives
+    )
+
+
+@register.inclusion_tag('includes/card_image.html')
+def card_image(post):
+    """
+    Картинка карточки: копии разных ширин и форматов в <picture>,
+    иначе исходная картинка, пока копии готовятся.
+    """
+    if not post.image:
+        return {}
+    derivatives = post.derivatives()
+    if not derivatives:
+        return {'src': post.image.url, 'pending': True}
+
+    storage = post.image.storage
+    formats = []
+    for item in derivatives:
+        if item['format'] not in formats:
+            formats.append(item['format'])
+    by_format = {
+        name: [item for item in derivatives if item['format'] == name]
+        for name in formats
+    }
+    fallback = by_format[formats[-1]]
+    largest = fallback[-1]
+    return {
+        'sources': [
+            {'type': thumbnails.FORMATS[name][1],
+             'srcset': srcset(storage, by_format[name])}
+            for name in formats[:-1]
+        ],
+        'src': storage.url(largest['name']),
+        'srcset': srcset(storage, fallback),
+        'sizes': CARD_SIZES,
+        'width': largest['width'],
+        'height': largest['height'],
+    }
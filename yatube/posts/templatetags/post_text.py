@@ -0,0 +1,14 @@
+from django import template
+
+from .. import rendering
+
+register = template.Library()
+
+
+@register.filter
+def text_html(obj):
+    """
+    Текст поста или комментария с переносами строк и ссылками.
+    HTML построен при сохранении записи, см. posts.rendering.
+    """
+    return rendering.html(obj)
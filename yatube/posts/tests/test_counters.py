@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import counters
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create(username='leomessi')
+        cls.follower = User.objects.create(username='follower')
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=CountersTest.author,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """
+        Проверка: счётчики меняются при создании и удалении
+        постов, комментариев и подписок.
+
+        """
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+        comment = Comment.objects.create(
+            post=self.post, author=self.follower, text='Комментарий'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.follower).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.follower).following_count, 0)
+
+        Post.objects.create(text='Второй пост', author=self.author).delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_recount_repairs_drift(self):
+        """
+        Проверка: recount находит и исправляет расхождения.
+
+        """
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=3)
+
+        drift = counters.recount(fix=False)
+        self.assertEqual(drift['posts_count'], 1)
+        self.assertEqual(drift['comments_count'], 1)
+
+        counters.recount()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertFalse(any(counters.recount(fix=False).values()))
+
+    def test_pages_without_count_queries(self):
+        """
+        Проверка: страницы профиля и поста не выполняют COUNT(*).
+
+        """
+        urls = (
+            reverse('profile', kwargs={'username': self.author.username}),
+            reverse('post', kwargs={'username': self.author.username,
+                                    'post_id': self.post.id}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.context['count'], 1)
+                for query in queries:
+                    self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+from posts import feed
+from posts.models import FeedItem, Follow, Post, PullAuthor, User
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.author = User.objects.create(username='leomessi')
+        cls.follower = User.objects.create(username='follower')
+        cls.other = User.objects.create(username='other')
+
+    def test_new_post_fans_out_to_followers(self):
+        """
+        Проверка: новый пост попадает в ленты подписчиков автора.
+
+        """
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertFalse(FeedItem.objects.filter(user=self.other).exists())
+        self.assertEqual(list(feed.for_user(self.follower)), [post])
+
+    def test_follow_and_unfollow_update_feed(self):
+        """
+        Проверка: при подписке лента заполняется постами автора,
+        при отписке — очищается.
+
+        """
+        post = Post.objects.create(text='Старый пост', author=self.author)
+
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(list(feed.for_user(self.follower)), [post])
+
+        follow.delete()
+        self.assertEqual(list(feed.for_user(self.follower)), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_request(self):
+        """
+        Проверка: посты автора с большим числом подписчиков
+        не раскладываются по лентам, но видны подписчикам.
+
+        """
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Популярный пост', author=self.author)
+
+        self.assertTrue(
+            PullAuthor.objects.filter(author=self.author).exists()
+        )
+        self.assertFalse(FeedItem.objects.filter(post=post).exists())
+        self.assertEqual(list(feed.for_user(self.follower)), [post])
+        self.assertEqual(list(feed.for_user(self.other)), [post])
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -23,6 +24,13 @@ class PostCreateFormTests(TestCase):
         )
         cls.form = PostForm()
         cls.form = CommentForm()
+        cls.small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
 
     @classmethod
     def tearDownClass(cls):
@@ -38,7 +46,9 @@ class PostCreateFormTests(TestCase):
         cache.clear()
 
         self.redirect_guest = '/auth/login/?next=%2Fnew%2F'
-        self.image_name = 'posts/small.gif'
+        # картинки хранятся под хешем содержимого, см. posts.storage
+        self.image_hash = hashlib.sha256(self.small_gif).hexdigest()
+        self.image_name = f'posts/{self.image_hash[:2]}/{self.image_hash}.gif'
         self.redirect_guest_comment = '/auth/login/?next=/leomessi/1/comment/'
 
     def test_create_post(self):
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Mention, Post, PostTag, User
+
+
+class LinksTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.friend = User.objects.create(username='neymar')
+        cls.post = Post.objects.create(
+            text='Играем в #Футбол с @neymar и @nobody. <b>#Barca</b>',
+            author=LinksTest.user,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.friend_client = Client()
+        self.friend_client.force_login(self.friend)
+        cache.clear()
+
+    def test_links_are_rendered_from_spans(self):
+        """
+        Проверка: теги и упоминания существующих пользователей
+        выводятся ссылками, остальной текст экранирован.
+        """
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(
+            response,
+            'Играем в <a href="/tag/%D1%84%D1%83%D1%82%D0%B1%D0%BE%D0%BB/">'
+            '#Футбол</a> с <a href="/neymar/">@neymar</a> и @nobody. '
+            '&lt;b&gt;<a href="/tag/barca/">#Barca</a>&lt;/b&gt;',
+            html=False,
+        )
+
+    def test_tag_page(self):
+        """Проверка: страница тега показывает посты только с этим тегом."""
+        Post.objects.create(text='Без тегов', author=self.user)
+        response = self.guest_client.get(
+            reverse('tag_posts', args=['ФУТБОЛ'])
+        )
+        self.assertEqual(list(response.context['page']), [self.post])
+        response = self.guest_client.get(reverse('tag_posts', args=['x']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_edit_updates_links(self):
+        """Проверка: после правки поста связи соответствуют тексту."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Теперь только #Barca и @leomessi'
+        post.save()
+        self.assertEqual(
+            list(PostTag.objects.filter(post=post).values_list(
+                'tag__name', flat=True
+            )),
+            ['barca'],
+        )
+        # упоминание себя не попадает в ленту упоминаний
+        self.assertFalse(Mention.objects.filter(post=post).exists())
+        self.assertEqual(post.spans()[1][2:], ['user', 'leomessi'])
+
+    def test_mentions_feed(self):
+        """Проверка: лента упоминаний показывает посты с @именем."""
+        response = self.friend_client.get(reverse('mentions'))
+        self.assertEqual(list(response.context['page']), [self.post])
+
+        response = self.guest_client.get(reverse('mentions'))
+        self.assertRedirects(
+            response, reverse('login') + '?next=' + reverse('mentions')
+        )
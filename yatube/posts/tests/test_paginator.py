@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Post, User
+from posts.paginator import CursorPaginator
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        for record in range(0, 25):
+            Post.objects.create(
+                text=f'Тестовый текст поста: запись {record}',
+                author=CursorPaginatorTest.user,
+            )
+        # одинаковая дата у всех постов: порядок задаёт id
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_pages_follow_cursor(self):
+        """
+        Проверка: страницы по курсору идут без пропусков и повторов,
+        ссылка назад возвращает на предыдущую страницу.
+
+        """
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        seen = [post.id for page in (first, second, third) for post in page]
+        expected = list(
+            Post.objects.order_by('-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertIsNone(first.previous_cursor)
+        self.assertIsNone(third.next_cursor)
+
+        back = paginator.get_page(third.previous_cursor)
+        self.assertEqual(list(back), list(second))
+        back = paginator.get_page(back.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertIsNone(back.previous_cursor)
+
+    def test_broken_cursor_returns_first_page(self):
+        """
+        Проверка: с некорректным курсором отдаётся первая страница.
+
+        """
+        response = self.guest_client.get(
+            reverse('index'), {'cursor': 'не-курсор'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.context['page']),
+            list(Post.objects.order_by('-id')[:10]),
+        )
+
+    def test_deep_page_has_no_count_query(self):
+        """
+        Проверка: страница по курсору читается одним запросом без COUNT.
+
+        """
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        cursor = paginator.get_page(None).next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.get_page(cursor)
+            self.assertEqual(len(page.object_list), 10)
@@ -0,0 +1,99 @@
+import datetime as dt
+import os
+
+from django.core.cache import cache
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Comment, Group, Post, User
+
+SNAPSHOTS = os.path.join(os.path.dirname(__file__), 'snapshots')
+
+
+def snapshot(name, **values):
+    with open(os.path.join(SNAPSHOTS, name), encoding='utf-8') as file:
+        return file.read().format(**values)
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leomessi', first_name='Лионель', last_name='Месси'
+        )
+        cls.reader = User.objects.create(username='neymar')
+        cls.group = Group.objects.create(
+            title='Футбол', slug='football', description='О футболе'
+        )
+        cls.first = Post.objects.create(
+            text='Первый пост\nпро #мяч', author=PostCardsTest.user,
+            group=PostCardsTest.group,
+        )
+        cls.second = Post.objects.create(
+            text='Второй пост <b>для @neymar</b>',
+            author=PostCardsTest.user, group=PostCardsTest.group,
+        )
+        Comment.objects.create(
+            post=PostCardsTest.second, author=PostCardsTest.reader,
+            text='Комментарий',
+        )
+        date = timezone.make_aware(dt.datetime(2020, 5, 17, 12, 30))
+        Post.objects.filter(pk=cls.first.pk).update(pub_date=date)
+        Post.objects.filter(pk=cls.second.pk).update(
+            pub_date=date + dt.timedelta(days=1)
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        cache.clear()
+
+    def render(self, user, after=''):
+        template = engines['django'].from_string(
+            '{% load post_cards %}{% post_cards posts ' + after + '%}'
+        )
+        posts = Post.objects.select_related('author', 'group')
+        return template.render({'posts': posts, 'user': user})
+
+    def values(self):
+        return {'first': self.first.pk, 'second': self.second.pk}
+
+    def test_cards_match_snapshot(self):
+        """
+        Проверка: карточки из кеша, свежие карточки и карточки через
+        includes/post_item.html совпадают с сохранённым снимком.
+        """
+        expected = snapshot('post_cards.html', **self.values())
+        self.assertHTMLEqual(self.render(self.user), expected)
+        # второй раз карточки берутся из кеша
+        self.assertHTMLEqual(self.render(self.user), expected)
+        with self.settings(POST_CARDS_BATCHED=False):
+            self.assertHTMLEqual(self.render(self.user), expected)
+            cache.clear()
+            self.assertHTMLEqual(self.render(self.user), expected)
+
+    def test_footer_is_not_cached(self):
+        """Проверка: кнопка редактирования видна только автору."""
+        self.render(self.user)
+        html = self.render(self.reader)
+        self.assertNotIn('Редактировать', html)
+        self.assertEqual(self.render(self.user).count('Редактировать'), 2)
+
+    def test_after_template(self):
+        """Проверка: after выводится после каждой карточки."""
+        html = self.render(self.reader, 'after="includes/post_byline.html" ')
+        self.assertEqual(html.count('Автор: Лионель Месси'), 2)
+        self.assertLess(html.index('Второй пост'), html.index('Автор:'))
+
+    def test_group_page_is_the_same(self):
+        """Проверка: страница группы одинакова при обоих способах вывода."""
+        url = reverse('group_posts', args=[self.group.slug])
+        batched = self.author_client.get(url).content.decode()
+        cache.clear()
+        with override_settings(POST_CARDS_BATCHED=False):
+            included = self.author_client.get(url).content.decode()
+        self.assertHTMLEqual(batched, included)
+        self.assertEqual(batched.count('Редактировать'), 2)
@@ -0,0 +1,82 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import profiling
+from posts.models import Post, User
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.post = Post.objects.create(text='Текст', author=ProfilingTest.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def get(self, url):
+        with self.assertLogs('posts.profiling', 'INFO') as logs:
+            response = self.guest_client.get(url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_request_is_profiled(self):
+        """
+        Проверка: в лог и в Server-Timing попадают view, SQL-запросы,
+        время отрисовки и промахи и попадания кеша страниц.
+        """
+        response, record = self.get(reverse('index'))
+        self.assertEqual(record['view'], 'index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['render_ms'], 0)
+        # промах кеша страницы и карточки
+        self.assertEqual(record['cache_misses'], 2)
+        timing = response['Server-Timing']
+        self.assertIn(f'db;dur={record["db_ms"]};'
+                      f'desc="{record["db_queries"]} SQL"', timing)
+        self.assertIn(f'render;dur={record["render_ms"]}', timing)
+
+        response, record = self.get(reverse('index'))
+        self.assertEqual((record['cache_hits'], record['cache_misses']),
+                         (1, 0))
+        self.assertEqual(record['render_ms'], 0)
+
+        response, record = self.get(
+            reverse('post', args=[self.user.username, self.post.pk])
+        )
+        self.assertEqual(record['view'], 'post_view')
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled(self):
+        """Проверка: при нулевой доле запросы не профилируются."""
+        response = Client().get(reverse('index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_nested_timings_are_counted_once(self):
+        """Проверка: вложенные замеры с одним именем не суммируются."""
+        calls = []
+
+        @profiling.timed('render')
+        def render(depth):
+            calls.append(depth)
+            if depth:
+                render(depth - 1)
+
+        profile = profiling.Profile()
+        token = profiling.current.set(profile)
+        try:
+            render(2)
+        finally:
+            profiling.current.reset(token)
+        self.assertEqual(calls, [2, 1, 0])
+        self.assertFalse(profile.active)
+        self.assertGreater(profile.timings['render'], 0)
+        # вне профилируемого запроса замер не ведётся
+        render(0)
+        self.assertIsNone(profiling.current.get())
@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import rendering
+from posts.models import Comment, Post, User
+
+
+class RenderingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.post = Post.objects.create(
+            text='Первая строка <i>курсив</i>\nВторая #строка',
+            author=RenderingTest.user,
+        )
+        cls.comment = Comment.objects.create(
+            post=RenderingTest.post, author=RenderingTest.user,
+            text='Комментарий\n<script>',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_html_is_stored_on_save(self):
+        """Проверка: при сохранении HTML текста записывается в запись."""
+        self.assertEqual(
+            self.post.text_html,
+            'Первая строка &lt;i&gt;курсив&lt;/i&gt;<br>'
+            'Вторая <a href="/tag/%D1%81%D1%82%D1%80%D0%BE%D0%BA%D0%B0/">'
+            '#строка</a>',
+        )
+        self.assertEqual(self.comment.text_html,
+                         'Комментарий<br>&lt;script&gt;')
+        self.assertEqual(self.post.text_html_version, rendering.VERSION)
+
+        response = self.guest_client.get(
+            reverse('post', args=[self.user.username, self.post.pk])
+        )
+        self.assertContains(response, self.post.text_html)
+        self.assertContains(response, self.comment.text_html)
+
+    def test_stale_html_is_rebuilt(self):
+        """
+        Проверка: HTML прежней версии не выводится,
+        rerender_text перестраивает его и сбрасывает карточку.
+        """
+        Post.objects.filter(pk=self.post.pk).update(
+            text_html='устаревший', text_html_version=0
+        )
+        Comment.objects.filter(pk=self.comment.pk).update(
+            text_html='устаревший', text_html_version=0
+        )
+        response = self.guest_client.get(
+            reverse('post', args=[self.user.username, self.post.pk])
+        )
+        self.assertNotContains(response, 'устаревший')
+
+        version = Post.objects.get(pk=self.post.pk).version
+        call_command('rerender_text', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text_html, self.post.text_html)
+        self.assertEqual(post.version, version + 1)
+        self.assertFalse(rendering.stale(Comment).exists())
@@ -0,0 +1,139 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import search
+from posts.models import (Comment, Post, SearchChange, SearchCheckpoint,
+                          User)
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.cats = Post.objects.create(
+            text='Кот сидит на окне. Кот смотрит на котиков во дворе.',
+            author=SearchTest.user,
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки гуляют в парке, а один кот спит '
+                 'на скамейке у самого входа в парк.',
+            author=SearchTest.user,
+        )
+        cls.birds = Post.objects.create(
+            text='Птицы <b>поют</b> по утрам',
+            author=SearchTest.user,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def found(self, query):
+        response = self.guest_client.get(reverse('search'), {'q': query})
+        return [post.pk for post in response.context['page']]
+
+    def test_search_url_is_not_a_profile(self):
+        """Проверка: /search/ — страница поиска, а не профиль."""
+        response = self.guest_client.get('/search/')
+        self.assertTemplateUsed(response, 'search.html')
+        self.assertIsNone(response.context['page'])
+
+    def test_word_forms_are_found(self):
+        """
+        Проверка: поиск находит другие формы слова,
+        а лучшее совпадение идёт первым.
+        """
+        self.assertEqual(self.found('котов'), [self.cats.pk, self.dogs.pk])
+        self.assertEqual(self.found('парк собака'), [self.dogs.pk])
+        self.assertEqual(self.found('слон'), [])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Проверка: найденные слова выделены, текст экранирован."""
+        response = self.guest_client.get(reverse('search'), {'q': 'пение'})
+        self.assertEqual(response.context['page'].object_list, [])
+        response = self.guest_client.get(reverse('search'), {'q': 'поют'})
+        self.assertContains(
+            response, '&lt;b&gt;<mark>поют</mark>&lt;/b&gt; по утрам'
+        )
+
+    def test_comments_are_searched(self):
+        """Проверка: пост находится по тексту комментария."""
+        Comment.objects.create(
+            post=self.birds, author=self.user, text='Соловьи особенно'
+        )
+        response = self.guest_client.get(
+            reverse('search'), {'q': 'соловей'}
+        )
+        post = response.context['page'][0]
+        self.assertEqual(post.pk, self.birds.pk)
+        self.assertEqual(post.snippet, '<mark>Соловьи</mark> особенно')
+
+    def test_index_follows_changes(self):
+        """Проверка: индекс обновляется при правке и удалении поста."""
+        post = Post.objects.get(pk=self.birds.pk)
+        post.text = 'Жаворонки поют по утрам'
+        post.save()
+        self.assertEqual(self.found('жаворонков'), [post.pk])
+        self.assertEqual(self.found('птица'), [])
+
+        post.delete()
+        self.assertEqual(self.found('жаворонков'), [])
+
+    def test_admin_uses_index(self):
+        """Проверка: поиск в админке идёт по тому же индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котов'}
+        )
+        self.assertEqual(
+            {post.pk for post in response.context['cl'].result_list},
+            {self.cats.pk, self.dogs.pk},
+        )
+
+    def test_stem(self):
+        """Проверка: формы слова сводятся к одной основе."""
+        self.assertEqual(search.stem('Ёжики'), search.stem('ежик'))
+        self.assertEqual(search.stem('красивые'), search.stem('красивая'))
+
+    def test_reindex_rebuilds_index(self):
+        """
+        Проверка: reindex_search заполняет индекс заново, продолжает
+        с отметки и удаляет строки удалённых записей.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        SearchCheckpoint.objects.create(source='post', last_pk=self.dogs.pk)
+        call_command('reindex_search', '--resume', '--chunk-size', '1',
+                     stdout=StringIO())
+        self.assertEqual(self.found('котов'), [])
+        self.assertEqual(self.found('птица'), [self.birds.pk])
+
+        search.write([(search.post_key(1000), 'Кот', 1000)])
+        call_command('reindex_search', stdout=StringIO())
+        self.assertEqual(self.found('котов'), [self.cats.pk, self.dogs.pk])
+        self.assertFalse(SearchCheckpoint.objects.exists())
+
+    @override_settings(SEARCH_INDEX_DEFERRED=True)
+    def test_deferred_changes(self):
+        """
+        Проверка: при отложенной индексации изменения копятся
+        в журнале и переносятся в индекс командой --incremental.
+        """
+        post = Post.objects.create(text='Жирафы', author=self.user)
+        self.assertEqual(self.found('жираф'), [])
+        call_command('reindex_search', '--incremental', stdout=StringIO())
+        self.assertEqual(self.found('жираф'), [post.pk])
+
+        post.delete()
+        call_command('reindex_search', '--incremental', stdout=StringIO())
+        self.assertEqual(self.found('жираф'), [])
+        self.assertFalse(SearchChange.objects.exists())
@@ -0,0 +1,146 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from posts import thumbnails
+from posts.cache import generations
+from posts.models import Post, User
+from posts.storage import image_storage, is_content_addressed
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        picture = BytesIO()
+        Image.new('RGB', (800, 600), 'green').save(picture, 'PNG')
+        cls.picture = picture.getvalue()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, name='picture.png'):
+        return Post.objects.create(
+            text='Тестовый текст поста',
+            author=self.user,
+            image=SimpleUploadedFile(name, self.picture, 'image/png'),
+        )
+
+    def test_same_image_is_stored_once(self):
+        """
+        Проверка: одинаковые картинки под разными именами
+        хранятся одним файлом.
+        """
+        first = self.create_post('first.png')
+        second = self.create_post('second.PNG')
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+        directory = os.path.dirname(image_storage.path(first.image.name))
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(first.image.name)])
+
+    def test_derivatives_are_shared(self):
+        """
+        Проверка: копии для srcset создаются один раз и достаются
+        всем постам с той же картинкой.
+        """
+        first = self.create_post()
+        second = self.create_post()
+        thumbnails.generate(first.pk)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(first.derivatives())
+        self.assertEqual(first.image_derivatives, second.image_derivatives)
+
+        third = self.create_post()
+        with self.settings(IMAGE_DERIVATIVE_WIDTHS=()):
+            # копии не пересоздаются, а берутся у других постов
+            thumbnails.generate(third.pk)
+        third.refresh_from_db()
+        self.assertEqual(third.image_derivatives, first.image_derivatives)
+
+    def age(self, *names):
+        hours_ago = time.time() - 2 * 60 * 60
+        for name in names:
+            os.utime(image_storage.path(name), (hours_ago, hours_ago))
+
+    def test_unreferenced_files_are_swept(self):
+        """
+        Проверка: файл и его копии остаются после удаления постов
+        и удаляются dedupe_media, когда на них не ссылается ни один
+        пост; повторная загрузка защищает старый файл от удаления.
+        """
+        first = self.create_post()
+        second = self.create_post()
+        thumbnails.generate(first.pk)
+        first.refresh_from_db()
+        name = first.image.name
+        names = [name] + [item['name'] for item in first.derivatives()]
+        self.age(*names)
+
+        first.delete()
+        call_command('dedupe_media', stdout=StringIO())
+        self.assertTrue(all(image_storage.exists(name) for name in names))
+
+        second.delete()
+        # та же картинка загружается, пока пост с ней ещё не сохранён
+        image_storage.save('posts/again.png', ContentFile(self.picture))
+        call_command('dedupe_media', stdout=StringIO())
+        self.assertTrue(image_storage.exists(name))
+
+        self.age(name)
+        call_command('dedupe_media', stdout=StringIO())
+        for name in names:
+            self.assertFalse(image_storage.exists(name))
+
+    def test_dedupe_media_moves_legacy_files(self):
+        """
+        Проверка: dedupe_media переносит старые файлы под хешевые
+        имена, склеивает одинаковые, удаляет файлы без ссылок и
+        сбрасывает кеш страниц с перенесёнными картинками.
+        """
+        legacy = FileSystemStorage()
+        names = [legacy.save('posts/photo.png', ContentFile(self.picture))
+                 for _ in range(2)]
+        orphan = legacy.save('posts/orphan.png', ContentFile(b'orphan'))
+        hour_ago = time.time() - 2 * 60 * 60
+        os.utime(legacy.path(orphan), (hour_ago, hour_ago))
+        posts = [Post.objects.create(text='Старый пост', author=self.user,
+                                     image=name) for name in names]
+
+        output = StringIO()
+        call_command('dedupe_media', '--dry-run', stdout=output)
+        self.assertTrue(all(legacy.exists(name) for name in names))
+        self.assertIn('Освобождено', output.getvalue())
+
+        scopes = ['all', f'author:{self.user.username}']
+        before = generations(scopes)
+        call_command('dedupe_media', stdout=StringIO())
+        for old, new in zip(before, generations(scopes)):
+            self.assertGreater(new, old)
+        for post in posts:
+            post.refresh_from_db()
+        self.assertEqual(posts[0].image.name, posts[1].image.name)
+        self.assertTrue(is_content_addressed(posts[0].image.name))
+        self.assertTrue(image_storage.exists(posts[0].image.name))
+        for name in names + [orphan]:
+            self.assertFalse(legacy.exists(name))
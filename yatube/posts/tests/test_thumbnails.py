@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts import thumbnails
+from posts.models import Post, User
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        picture = BytesIO()
+        Image.new('RGB', (1200, 800), 'green').save(picture, 'PNG')
+        cls.picture = picture.getvalue()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=ThumbnailsTest.user,
+            image=SimpleUploadedFile(
+                name='small.gif', content=small_gif, content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_page_shows_original_until_derivatives_ready(self):
+        """
+        Проверка: пока копий нет, страница показывает исходную
+        картинку.
+
+        """
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, self.post.image.url)
+
+    def test_generate_makes_derivatives(self):
+        """
+        Проверка: generate создаёт копии картинки разных ширин
+        и форматов, карточка выводит их в srcset.
+
+        """
+        post = Post.objects.create(
+            text='Пост с большой картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(name='big.png', content=self.picture),
+        )
+        self.guest_client.get(reverse('index'))
+        thumbnails.generate(post.pk)
+
+        post.refresh_from_db()
+        derivatives = post.derivatives()
+        self.assertEqual(
+            [(item['width'], item['format']) for item in derivatives],
+            [(width, name) for width in (360, 540, 720, 960)
+             for name in ('webp', 'jpeg')],
+        )
+        for item in derivatives:
+            self.assertTrue(post.image.storage.exists(item['name']))
+
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(
+            response, post.image.storage.url(derivatives[-1]['name'])
+        )
+
+    def test_small_image_is_not_upscaled(self):
+        """
+        Проверка: копии не шире исходной картинки, кроме самой узкой.
+
+        """
+        thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        widths = {item['width'] for item in self.post.derivatives()}
+        self.assertEqual(widths, {360})
+
+    def test_new_image_resets_derivatives(self):
+        """
+        Проверка: при замене картинки прежние копии сбрасываются.
+
+        """
+        thumbnails.generate(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertTrue(post.derivatives())
+
+        post.image = SimpleUploadedFile(name='new.png', content=self.picture)
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.derivatives(), [])
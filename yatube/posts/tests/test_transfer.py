@@ -0,0 +1,133 @@
+import os
+import tempfile
+from io import StringIO
+from multiprocessing.pool import ThreadPool
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts import search, transfer
+from posts.models import (Comment, FeedItem, Follow, Group, Mention, Post,
+                          PostTag, User, UserStats)
+
+KINDS = ('user', 'group', 'post', 'comment', 'follow')
+
+
+class TransferTest(TestCase):
+    def setUp(self):
+        self.writer = User.objects.create(username='writer')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Котики', slug='cats', description='Про котиков'
+        )
+        Follow.objects.create(user=self.reader, author=self.writer)
+        self.post = Post.objects.create(
+            text='Пост про #котиков для @reader\n<b>', author=self.writer,
+            group=self.group,
+        )
+        Post.objects.create(text='Пост без группы', author=self.reader)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий про котиков')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def state(self):
+        """Всё, что сигналы заполняют при обычном сохранении."""
+        return {
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'author__username', 'group__slug',
+                'text_html', 'text_spans', 'comments_count',
+            )),
+            'comments': list(Comment.objects.order_by('pk').values_list(
+                'pk', 'post_id', 'author__username', 'text_html', 'created',
+            )),
+            'tags': set(PostTag.objects.values_list('post_id', 'tag__name')),
+            'mentions': set(Mention.objects.values_list(
+                'post_id', 'user__username'
+            )),
+            'feed': set(FeedItem.objects.values_list(
+                'user__username', 'post_id'
+            )),
+            'stats': set(UserStats.objects.values_list(
+                'user__username', 'posts_count', 'followers_count',
+                'following_count',
+            )),
+            'search': search.post_ids('котики'),
+        }
+
+    def round_trip(self, format):
+        before = self.state()
+        paths = {kind: os.path.join(self.directory.name, f'{kind}.{format}')
+                 for kind in KINDS}
+        for kind, path in paths.items():
+            call_command('export_data', kind, '--output', path,
+                         stdout=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.assertFalse(search.post_ids('котики'))
+
+        for kind, path in paths.items():
+            call_command('import_data', kind, path, '--batch-size', '1',
+                         stdout=StringIO())
+        self.assertEqual(self.state(), before)
+
+    def test_round_trip_jsonl(self):
+        """
+        Проверка: выгруженные в JSON Lines записи загружаются обратно
+        вместе с HTML, ссылками, лентами, счётчиками и индексом.
+        """
+        self.round_trip('jsonl')
+
+    def test_round_trip_csv(self):
+        """Проверка: то же для CSV."""
+        self.round_trip('csv')
+
+    def test_import_skips_existing_records(self):
+        """Проверка: повторная загрузка не дублирует записи."""
+        path = os.path.join(self.directory.name, 'posts.jsonl')
+        call_command('export_data', 'post', '--output', path,
+                     stdout=StringIO())
+        before = self.state()
+        output = StringIO()
+        call_command('import_data', 'post', path, stdout=output)
+        self.assertEqual(self.state(), before)
+        self.assertIn('Загружено записей: 0.', output.getvalue())
+
+    def test_new_records_follow_imported_ids(self):
+        """
+        Проверка: после загрузки с явными id новые посты получают
+        следующий свободный id, считаются только вставленные записи.
+        """
+        path = os.path.join(self.directory.name, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            transfer.write('post', [{
+                'id': pk, 'text': 'Пост', 'pub_date': self.post.pub_date,
+                'author': 'writer', 'group': '', 'image': '',
+                'image_derivatives': '',
+            } for pk in (self.post.pk, 1000)], file, 'jsonl')
+        output = StringIO()
+        call_command('import_data', 'post', path, stdout=output)
+        self.assertIn('Загружено записей: 1.', output.getvalue())
+        post = Post.objects.create(text='Новый пост', author=self.writer)
+        self.assertGreater(post.pk, 1000)
+
+    def test_bad_record_is_reported(self):
+        """Проверка: запись с неизвестной группой останавливает загрузку."""
+        path = os.path.join(self.directory.name, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            transfer.write('post', [{
+                'id': 100, 'text': 'Пост', 'pub_date': self.post.pub_date,
+                'author': 'writer', 'group': 'dogs', 'image': '',
+                'image_derivatives': '',
+            }], file, 'jsonl')
+        with self.assertRaisesMessage(CommandError, 'dogs'):
+            call_command('import_data', 'post', path, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=100).exists())
+
+    def test_imap_bounded_keeps_order(self):
+        """Проверка: пачки из процессов возвращаются по порядку."""
+        with ThreadPool(3) as pool:
+            results = list(transfer.imap_bounded(
+                pool, lambda number: number * 2, range(10), window=2
+            ))
+        self.assertEqual(results, [number * 2 for number in range(10)])
@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts.models import Post, User
+from posts.uploads import ORIENTATION, strip_jpeg_metadata
+
+
+def jpeg(size=(64, 48), **params):
+    picture = BytesIO()
+    Image.effect_noise(size, 50).convert('RGB').save(
+        picture, 'JPEG', **params
+    )
+    return picture.getvalue()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImageUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='leomessi')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def upload(self, content, name='photo.jpg'):
+        return self.authorized_client.post(reverse('new_post'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+        })
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_large_file_is_rejected(self):
+        """
+        Проверка: файл больше POST_IMAGE_MAX_SIZE отклоняется,
+        пост не создаётся.
+
+        """
+        response = self.upload(jpeg((256, 256)))
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_too_many_pixels_are_rejected(self):
+        """
+        Проверка: картинка с большим числом пикселей отклоняется
+        по заголовку.
+
+        """
+        response = self.upload(jpeg((64, 48)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка 64×48 слишком большая: допустимо не больше '
+            '1000 пикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10 ** 6)
+    def test_decompression_bomb_is_rejected(self):
+        """
+        Проверка: картинку, которую Pillow не открывает как слишком
+        большую, отклоняет та же проверка числа пикселей.
+
+        """
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            response = self.upload(jpeg((64, 48)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая: допустимо не больше '
+            '1000000 пикселей.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_csrf_is_checked(self):
+        """
+        Проверка: форма поста, сама включающая обработчик загрузки,
+        по-прежнему требует CSRF-токен.
+
+        """
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(reverse('new_post'), {
+            'text': 'Пост без токена',
+            'image': SimpleUploadedFile('photo.jpg', jpeg(), 'image/jpeg'),
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Post.objects.exists())
+
+    def test_jpeg_metadata_is_stripped(self):
+        """
+        Проверка: у JPEG убираются метаданные, ориентация кадра
+        и сам растр остаются прежними.
+
+        """
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[0x010F] = 'Камера'
+        original = jpeg(exif=exif.tobytes(), comment=b'secret')
+
+        self.upload(original)
+        post = Post.objects.get()
+        with post.image.open('rb'):
+            stored = post.image.read()
+
+        self.assertNotIn(b'secret', stored)
+        with Image.open(BytesIO(stored)) as image:
+            self.assertEqual(dict(image.getexif()), {ORIENTATION: 6})
+            pixels = image.tobytes()
+        with Image.open(BytesIO(original)) as image:
+            self.assertEqual(pixels, image.tobytes())
+
+    def test_truncated_jpeg_is_rejected(self):
+        """
+        Проверка: обрезанный JPEG (в том числе на байте 0xFF перед
+        маркером) — ошибка формы, а не ошибка сервера.
+
+        """
+        original = jpeg(comment=b'secret')
+        scan = original.index(b'\xff\xda')
+        for content in (original[:scan] + b'\xff\xff',
+                        original[:scan + 3], original[:20]):
+            with self.subTest(size=len(content)):
+                with self.assertRaises(ValueError):
+                    strip_jpeg_metadata(
+                        SimpleUploadedFile('photo.jpg', content)
+                    )
+                response = self.upload(content)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
@@ -5,9 +5,13 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Follow, Group, Post, User
+from posts import metrics
+from posts.cache import page_cache_stats
+from posts.models import Comment, Follow, Group, Post, User
 
 
 @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
@@ -374,16 +378,15 @@ class PostViewsTest(TestCase):
 
     def test_cache(self):
         """
-        Проверка кеширования главной страницы.
+        Проверка кеширования главной страницы: страница берётся
+        из кеша, пока не изменится пост.
 
         """
         response_content = self.authorized_client.get(reverse('index')).content
-        Post.objects.create(
-            text='Футбольный текст поста',
-            pub_date='29.07.2021',
-            author=PostViewsTest.user,
-            group=PostViewsTest.group,
-            image=PostViewsTest.uploaded,
+        # изменение в обход модели не сбрасывает кеш; готовый HTML
+        # текста при этом помечается устаревшим, см. posts.rendering
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Тихая правка', text_html_version=0
         )
         response_content_1 = self.authorized_client.get(
             reverse('index')
@@ -395,6 +398,41 @@ class PostViewsTest(TestCase):
         ).content
         self.assertNotEqual(response_content_1, response_content_2)
 
+        Post.objects.create(
+            text='Футбольный текст поста',
+            pub_date='29.07.2021',
+            author=PostViewsTest.user,
+            group=PostViewsTest.group,
+            image=PostViewsTest.uploaded,
+        )
+        response_content_3 = self.authorized_client.get(
+            reverse('index')
+        ).content
+        self.assertNotEqual(response_content_2, response_content_3)
+
+    def test_cache_metrics(self):
+        """
+        Проверка: попадания, промахи и сбросы кеша страниц считаются,
+        в общий кеш счётчики попадают не на каждое событие.
+
+        """
+        metrics.flush()
+        before = page_cache_stats(('index_page',))
+        with self.settings(METRICS_FLUSH_INTERVAL=3600):
+            self.authorized_client.get(reverse('index'))
+            self.authorized_client.get(reverse('index'))
+            self.post.save()
+            self.assertEqual(
+                cache.get(metrics.PREFIX + 'page_cache.index_page.hit', 0),
+                before['page_cache.index_page.hit'],
+            )
+
+        stats = page_cache_stats(('index_page',))
+        changes = {name: stats[name] - before[name] for name in stats}
+        self.assertEqual(changes['page_cache.index_page.miss'], 1)
+        self.assertEqual(changes['page_cache.index_page.hit'], 1)
+        self.assertGreaterEqual(changes['page_cache.all.invalidation'], 1)
+
     def test_follow_post(self):
         """
         Проверка системы подписки
@@ -468,3 +506,273 @@ class PostViewsTest(TestCase):
         )
         follow_counts = Follow.objects.count()
         self.assertEqual(follow_counts, 0)
+
+
+class PostListQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.follower = User.objects.create(username='follower')
+        cls.group = Group.objects.create(
+            title='Group Leo',
+            slug='leo',
+            description='leomessi'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.follower)
+        self.urls = (
+            reverse('index'),
+            reverse('group_posts', kwargs={'slug': self.group.slug}),
+            reverse('profile', kwargs={'username': self.user.username}),
+            reverse('follow_index'),
+        )
+
+    def create_posts(self, count):
+        for record in range(0, count):
+            post = Post.objects.create(
+                text=f'Тестовый текст поста: запись {record}',
+                author=self.user,
+                group=self.group,
+            )
+            Comment.objects.create(
+                post=post, author=self.follower, text='Комментарий'
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        """
+        Проверка: число запросов к БД на страницах со списком постов
+        не зависит от количества постов на странице.
+
+        """
+        self.create_posts(1)
+        small = {url: self.count_queries(url) for url in self.urls}
+        self.create_posts(9)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Group Leo',
+            slug='leo',
+            description='leomessi'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.group_url = reverse('group_posts', kwargs={'slug': 'leo'})
+        cache.clear()
+
+    def test_card_is_cached_until_post_changes(self):
+        """
+        Проверка: карточка поста берётся из кеша, пока пост
+        не отредактирован и к нему не добавлен комментарий.
+
+        """
+        self.reader_client.get(self.group_url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        response = self.reader_client.get(self.group_url)
+        self.assertContains(response, 'Тестовый текст поста')
+
+        self.authorized_client.post(
+            reverse('post_edit', kwargs={'username': 'leomessi',
+                                         'post_id': self.post.id}),
+            data={'text': 'Отредактированный текст', 'group': self.group.id},
+        )
+        response = self.reader_client.get(self.group_url)
+        self.assertContains(response, 'Отредактированный текст')
+
+        self.reader_client.post(
+            reverse('add_comment', kwargs={'username': 'leomessi',
+                                           'post_id': self.post.id}),
+            data={'text': 'Комментарий'},
+        )
+        response = self.reader_client.get(self.group_url)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_card_follows_group_and_author_renames(self):
+        """
+        Проверка: после переименования группы и автора карточки
+        на главной, в группе и в профиле показывают новые имена.
+
+        """
+        urls = (reverse('index'), self.group_url,
+                reverse('profile', kwargs={'username': 'leomessi'}))
+        for url in urls:
+            self.reader_client.get(url)
+
+        self.group.title = 'Group Barcelona'
+        self.group.save()
+        self.user.username = 'messi10'
+        self.user.save()
+        urls = urls[:2] + (reverse('profile',
+                                   kwargs={'username': 'messi10'}),)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertContains(response, '#Group Barcelona')
+                self.assertContains(response, '@messi10')
+                self.assertNotContains(response, '@leomessi')
+
+    def test_group_delete_expires_post_pages(self):
+        """
+        Проверка: после удаления группы главная, профиль автора
+        и страница поста не показывают ссылку на неё.
+
+        """
+        urls = (reverse('index'),
+                reverse('profile', kwargs={'username': 'leomessi'}),
+                reverse('post', kwargs={'username': 'leomessi',
+                                        'post_id': self.post.id}))
+        for url in urls:
+            self.assertContains(self.reader_client.get(url), '#Group Leo')
+
+        self.group.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertNotContains(response, '#Group Leo')
+
+    def test_edit_button_is_not_cached(self):
+        """
+        Проверка: кнопка редактирования в общей карточке
+        видна только автору поста.
+
+        """
+        response = self.authorized_client.get(self.group_url)
+        self.assertContains(response, 'Редактировать')
+        response = self.reader_client.get(self.group_url)
+        self.assertNotContains(response, 'Редактировать')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leomessi')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Group Leo',
+            slug='leo',
+            description='leomessi'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст поста',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = (
+            reverse('post', kwargs={'username': 'leomessi',
+                                    'post_id': self.post.id}),
+            reverse('profile', kwargs={'username': 'leomessi'}),
+            reverse('group_posts', kwargs={'slug': 'leo'}),
+        )
+        cache.clear()
+
+    def test_unchanged_page_is_not_modified(self):
+        """
+        Проверка: повторный запрос с ETag неизменённой страницы получает
+        304 за один лёгкий запрос к базе.
+        """
+        for url, queries in zip(self.urls, (1, 1, 1)):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(queries):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_missing_page_has_no_etag(self):
+        """
+        Проверка: ответ 404 на неизвестную группу или автора не несёт
+        ETag и повторный запрос не получает 304.
+        """
+        urls = (reverse('group_posts', kwargs={'slug': 'unknown'}),
+                reverse('profile', kwargs={'username': 'unknown'}))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.has_header('ETag'))
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH='*')
+                self.assertEqual(response.status_code, 404)
+
+    def test_changes_give_new_etag(self):
+        """
+        Проверка: комментарий меняет ETag всех трёх страниц, у разных
+        пользователей ETag разные.
+        """
+        etags = [self.guest_client.get(url)['ETag'] for url in self.urls]
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+        self.reader_client.post(
+            reverse('add_comment', kwargs={'username': 'leomessi',
+                                           'post_id': self.post.id}),
+            data={'text': 'Комментарий'},
+        )
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_comment_edit_gives_new_etag(self):
+        """
+        Проверка: правка и удаление комментария меняют ETag страницы
+        поста, старая копия не отдаётся кодом 304.
+        """
+        comment = Comment.objects.create(post=self.post, author=self.reader,
+                                         text='Комментарий')
+        url = self.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        comment.text = 'Исправленный комментарий'
+        comment.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный комментарий')
+
+        etag = response['ETag']
+        comment.delete()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Исправленный комментарий')
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.test import SimpleTestCase, override_settings
+from posts import warmup
+
+
+class WarmupTest(SimpleTestCase):
+    def engine(self):
+        loaders = [(
+            'django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )]
+        params = {
+            'NAME': 'warmup',
+            'DIRS': settings.TEMPLATES[0]['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {'loaders': loaders},
+        }
+        return DjangoTemplates(params).engine
+
+    def test_project_templates_are_cached(self):
+        """
+        Проверка: после прогрева шаблоны проекта и users/templates
+        лежат в кешированном загрузчике, шаблоны Django — нет.
+        """
+        engine = self.engine()
+        count = warmup.warm_templates(engine)
+        loader = engine.template_loaders[0]
+        names = {key.split('-')[0] for key in loader.get_template_cache}
+        self.assertEqual(len(names), count)
+        self.assertIn('index.html', names)
+        self.assertIn('includes/post_card.html', names)
+        self.assertIn('registration/login.html', names)
+        self.assertNotIn('admin/base.html', names)
+
+    def test_broken_template_is_skipped(self):
+        """Проверка: шаблон с ошибкой не прерывает прогрев."""
+        engine = self.engine()
+        get_template = engine.get_template
+
+        def broken(name):
+            if name == 'index.html':
+                raise warmup.TemplateSyntaxError('ошибка')
+            return get_template(name)
+
+        with mock.patch.object(engine, 'get_template', broken), \
+                self.assertLogs('posts.warmup', 'ERROR'):
+            count = warmup.warm_templates(engine)
+        self.assertEqual(count, self.count_templates(engine) - 1)
+
+    def count_templates(self, engine):
+        return sum(
+            len(list(warmup.template_names(directory)))
+            for directory in warmup.template_dirs(engine)
+        )
+
+    @override_settings(TEMPLATES_WARMUP=True)
+    def test_ready_warms_templates(self):
+        """Проверка: PostsConfig.ready() прогревает шаблоны по настройке."""
+        with mock.patch.object(warmup, 'warm_templates') as warm:
+            apps.get_app_config('posts').ready()
+        warm.assert_called_once_with()
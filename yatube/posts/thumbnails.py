@@ -0,0 +1,154 @@
+"""
+Копии картинок постов готовятся заранее, в фоновом потоке.
+
+Для каждой картинки создаются кадрированные под карточку копии
+нескольких ширин и форматов (settings.IMAGE_DERIVATIVE_*); их список
+хранится в Post.image_derivatives и попадает в srcset карточки.
+Пока копий нет, карточка показывает исходную картинку.
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from .cache import bump, post_scopes
+
+logger = logging.getLogger(__name__)
+
+CARD_WIDTH, CARD_HEIGHT = 960, 339
+ORIENTATION = 0x0112
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def derivative_widths(source_width):
+    # больше исходной картинки не растягиваем, но самая узкая копия
+    # есть всегда: карточка не должна остаться без картинки
+    widths = sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+    return [width for width in widths
+            if width <= source_width or width == widths[0]]
+
+
+def make_derivatives(image):
+    """Создаёт копии картинки и возвращает их описание."""
+    storage = image.storage
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    with image.open('rb'):
+        source = Image.open(image)
+        # JPEG декодируется сразу уменьшенным (в 2, 4 или 8 раз), но не
+        # меньше карточки; у повёрнутого кадра стороны меняются местами
+        rotated = source.getexif().get(ORIENTATION, 1) in (5, 6, 7, 8)
+        source.draft('RGB', (CARD_HEIGHT, CARD_WIDTH) if rotated
+                     else (CARD_WIDTH, CARD_HEIGHT))
+        source = ImageOps.exif_transpose(source).convert('RGB')
+    widths = derivative_widths(source.width)
+    # кадр кадрируется один раз, в самой большой ширине,
+    # остальные копии уменьшаются из него
+    largest = ImageOps.fit(
+        source, (widths[-1], round(widths[-1] * CARD_HEIGHT / CARD_WIDTH)),
+        Image.LANCZOS,
+    )
+    del source
+    derivatives = []
+    for width in reversed(widths):
+        height = round(width * CARD_HEIGHT / CARD_WIDTH)
+        frame = largest.resize((width, height), Image.LANCZOS)
+        for name in settings.IMAGE_DERIVATIVE_FORMATS:
+            pil_format, _ = FORMATS[name]
+            buffer = BytesIO()
+            frame.save(buffer, pil_format,
+                       quality=settings.IMAGE_DERIVATIVE_QUALITY)
+            path = storage.save(
+                f'posts/derivatives/{stem}-{width}.{name}',
+                ContentFile(buffer.getvalue()),
+            )
+            derivatives.append({
+                'name': path, 'format': name, 'width': width,
+                'height': height, 'size': buffer.tell(),
+            })
+    return sorted(derivatives, key=lambda item: item['width'])
+
+
+def generate(post_id):
+    """
+    Создаёт копии картинки поста и сбрасывает кеш страниц с постом.
+    Одинаковые картинки хранятся одним файлом (posts.storage), поэтому
+    готовые копии другого поста с той же картинкой используются снова,
+    а новые записываются всем постам с этой картинкой.
+    """
+    from .models import Post
+
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    name = post.image.name
+    posts = list(
+        Post.objects.select_related('author', 'group').filter(image=name)
+    )
+    ready = [other.image_derivatives for other in posts
+             if other.image_derivatives]
+    if ready and not post.image_derivatives:
+        derivatives = json.loads(ready[0])
+    else:
+        derivatives = make_derivatives(post.image)
+    value = json.dumps(derivatives)
+    Post.objects.filter(image=name).exclude(
+        image_derivatives=value
+    ).update(image_derivatives=value, version=F('version') + 1)
+    # прежние копии и копии уже заменённой картинки удалит dedupe_media
+    for other in posts:
+        bump(*post_scopes(other))
+
+
+def _run(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось создать копии картинки поста %s',
+                         post_id)
+    finally:
+        with _lock:
+            _pending.discard(post_id)
+        connection.close()
+
+
+def submit(post_id):
+    with _lock:
+        if post_id in _pending:
+            return
+        _pending.add(post_id)
+    executor().submit(_run, post_id)
+
+
+def schedule(post):
+    """Ставит создание копий в очередь после фиксации транзакции."""
+    if post.image:
+        post_id = post.pk
+        transaction.on_commit(lambda: submit(post_id))
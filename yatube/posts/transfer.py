@@ -0,0 +1,328 @@
+"""
+Выгрузка и загрузка пользователей, групп, постов, комментариев
+и подписок.
+
+Записи читаются и пишутся потоком в JSON Lines (объект на строку) или
+CSV (первая строка — имена полей), поэтому память не зависит от размера
+файла. Пользователи, группы и посты указываются по username, slug и id;
+недостающие пользователи создаются без пароля, группы и посты должны
+быть загружены раньше. Загружать по порядку: user, group, post,
+comment, follow — упоминания в постах становятся ссылками, только если
+пользователь уже есть. Пароли не выгружаются.
+
+Загрузка идёт пачками через bulk_create, каждая пачка в своей
+транзакции, уже существующие записи пропускаются. Сигналы при этом не
+срабатывают, поэтому то, что они делают при обычном сохранении, делается
+здесь же для всей пачки разом: prepare() строит HTML текста, ссылки
+и строки поискового индекса (это можно отдать процессам), save() пишет
+пачку в базу. Ленты подписок и счётчики заполняются после загрузки
+(feed.fill, counters.recount).
+"""
+import csv
+import json
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.dateparse import parse_datetime
+
+from . import links, rendering, search
+from .cache import bump
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+
+# вид записей: (модель, {поле файла: поле для values_list})
+KINDS = {
+    'user': (User, {
+        'username': 'username', 'first_name': 'first_name',
+        'last_name': 'last_name', 'email': 'email',
+        'date_joined': 'date_joined',
+    }),
+    'group': (Group, {
+        'title': 'title', 'slug': 'slug', 'description': 'description',
+    }),
+    'post': (Post, {
+        'id': 'id', 'text': 'text', 'pub_date': 'pub_date',
+        'author': 'author__username', 'group': 'group__slug',
+        'image': 'image', 'image_derivatives': 'image_derivatives',
+    }),
+    'comment': (Comment, {
+        'id': 'id', 'post': 'post_id', 'author': 'author__username',
+        'text': 'text', 'created': 'created',
+    }),
+    'follow': (Follow, {
+        'user': 'user__username', 'author': 'author__username',
+    }),
+}
+
+
+def fields(kind):
+    return list(KINDS[kind][1])
+
+
+def rows(kind, chunk_size=2000):
+    """Записи вида kind словарями по порядку pk, без загрузки всей таблицы."""
+    model, columns = KINDS[kind]
+    values = model.objects.order_by('pk').values_list(*columns.values())
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, row))
+
+
+def dump(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write(kind, records, file, format):
+    """Пишет записи в открытый файл; возвращает их число."""
+    count = 0
+    if format == 'csv':
+        writer = csv.DictWriter(file, fields(kind))
+        writer.writeheader()
+        for count, record in enumerate(records, 1):
+            writer.writerow({name: '' if value is None else dump(value)
+                             for name, value in record.items()})
+        return count
+    for count, record in enumerate(records, 1):
+        file.write(json.dumps(
+            {name: dump(value) for name, value in record.items()},
+            ensure_ascii=False,
+        ) + '\n')
+    return count
+
+
+def read(file, format):
+    """Записи из открытого файла по одной."""
+    if format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            raise ValueError(f'строка {number}: {error}')
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def imap_bounded(pool, function, items, window):
+    """
+    Как pool.imap, но в работе не больше window заданий: imap читает
+    items целиком заранее, а пачки большого файла в память не помещаются.
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (item,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+def optional(value):
+    # пустая ячейка CSV и null в JSON одинаково означают «нет»
+    return value if value not in ('', None) else None
+
+
+def date(value):
+    if isinstance(value, datetime):
+        return value
+    parsed = parse_datetime(value or '')
+    if parsed is None:
+        raise ValueError(f'неверная дата: {value!r}')
+    return parsed
+
+
+def decode(kind, record):
+    """Несохранённая запись и её ссылки {поле: username или slug}."""
+    if kind == 'user':
+        return User(
+            username=record['username'], first_name=record['first_name'],
+            last_name=record['last_name'], email=record['email'],
+            date_joined=date(record['date_joined']), password='!',
+        ), {}
+    if kind == 'group':
+        return Group(title=record['title'], slug=record['slug'],
+                     description=record['description']), {}
+    if kind == 'post':
+        post = Post(
+            id=int(record['id']), text=record['text'],
+            pub_date=date(record['pub_date']),
+            image=optional(record.get('image')) or '',
+            image_derivatives=optional(record.get('image_derivatives')) or '',
+        )
+        return post, {'author': record['author'],
+                      'group': optional(record.get('group'))}
+    if kind == 'comment':
+        comment = Comment(
+            id=int(record['id']), post_id=int(record['post']),
+            text=record['text'], created=date(record['created']),
+        )
+        return comment, {'author': record['author']}
+    return Follow(), {'user': record['user'], 'author': record['author']}
+
+
+def prepare(task):
+    """
+    Разбирает пачку (kind, [записи]): записи с HTML текста, ссылки
+    и строки поискового индекса. Может выполняться в другом процессе.
+    """
+    kind, records = task
+    decoded = [decode(kind, record) for record in records]
+    objects = [obj for obj, _ in decoded]
+    if kind == 'post':
+        links.parse_many(objects)
+    documents = []
+    if kind in ('post', 'comment'):
+        for obj in objects:
+            rendering.prepare(obj)
+        if kind == 'post':
+            texts = [(search.post_key(post.pk), post.text, post.pk)
+                     for post in objects]
+        else:
+            texts = [(search.comment_key(comment.pk), comment.text,
+                      comment.post_id) for comment in objects]
+        documents = search.documents(texts)
+    return kind, decoded, documents
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now_add, чтобы задать даты вручную."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def user_ids(names):
+    """id пользователей по username; недостающие создаются без пароля."""
+    ids = dict(User.objects.filter(username__in=names).values_list(
+        'username', 'pk'
+    ))
+    missing = set(names) - set(ids)
+    if missing:
+        User.objects.bulk_create(
+            (User(username=name, password='!') for name in missing),
+            ignore_conflicts=True,
+        )
+        ids.update(User.objects.filter(username__in=missing).values_list(
+            'username', 'pk'
+        ))
+    return ids
+
+
+def group_ids(slugs):
+    ids = dict(Group.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+    missing = set(slugs) - set(ids)
+    if missing:
+        raise ValueError(f'нет групп: {", ".join(sorted(missing))}')
+    return ids
+
+
+def resolve(decoded):
+    """Заменяет username и slug в ссылках записей на id."""
+    names = {name for _, refs in decoded
+             for field, name in refs.items() if field != 'group'}
+    slugs = {refs['group'] for _, refs in decoded if refs.get('group')}
+    users = user_ids(names) if names else {}
+    groups = group_ids(slugs) if slugs else {}
+    for obj, refs in decoded:
+        for field, name in refs.items():
+            ids = groups if field == 'group' else users
+            setattr(obj, f'{field}_id', ids[name] if name else None)
+
+
+def save(kind, decoded, documents):
+    """Записывает разобранную prepare() пачку в одной транзакции."""
+    model = KINDS[kind][0]
+    with transaction.atomic():
+        resolve(decoded)
+        objects = [obj for obj, _ in decoded]
+        if kind == 'follow':
+            objects = [follow for follow in objects
+                       if follow.user_id != follow.author_id]
+        count = len(new_keys(kind, objects))
+        with manual_dates(Post._meta.get_field('pub_date'),
+                          Comment._meta.get_field('created')):
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+        if kind == 'post':
+            links.save_new_links(objects)
+        search.store(documents)
+        expire(kind, objects)
+    return count
+
+
+# поле, по которому bulk_create(ignore_conflicts=True) пропускает запись
+KEYS = {'user': ('username',), 'group': ('slug',), 'post': ('pk',),
+        'comment': ('pk',), 'follow': ('user_id', 'author_id')}
+
+
+def new_keys(kind, objects):
+    """
+    Ключи записей, которых ещё нет в базе: bulk_create с
+    ignore_conflicts не сообщает, сколько строк вставлено.
+    """
+    model, names = KINDS[kind][0], KEYS[kind]
+    keys = {tuple(getattr(obj, name) for name in names) for obj in objects}
+    filters = {f'{name}__in': {key[number] for key in keys}
+               for number, name in enumerate(names)}
+    return keys - set(model.objects.filter(**filters).values_list(*names))
+
+
+def reset_sequences(kind):
+    """
+    Сдвигает последовательность id за наибольший загруженный: посты
+    и комментарии загружаются со своими id, и без этого следующая
+    обычная запись получила бы уже занятый id. В SQLite не нужно.
+    """
+    model = KINDS[kind][0]
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def expire(kind, objects):
+    """Сбрасывает кеш страниц и карточек, на которых видны записи."""
+    if kind == 'follow':
+        user_ids = {follow.user_id for follow in objects}
+        user_ids |= {follow.author_id for follow in objects}
+        names = User.objects.filter(pk__in=user_ids).values_list(
+            'username', flat=True
+        )
+        bump(*(f'author:{name}' for name in names))
+        return
+    if kind == 'user':
+        return
+    if kind == 'group':
+        bump(*(f'group:{group.slug}' for group in objects))
+        return
+    post_ids = {obj.pk if kind == 'post' else obj.post_id for obj in objects}
+    posts = Post.objects.filter(pk__in=post_ids)
+    # у комментированных постов меняется счётчик в карточке
+    posts.update(version=F('version') + 1)
+    scopes = {'all'}
+    for author, group in posts.values_list('author__username', 'group__slug'):
+        scopes.add(f'author:{author}')
+        if group is not None:
+            scopes.add(f'group:{group}')
+    bump(*scopes)
@@ -0,0 +1,198 @@
+"""
+Загрузка картинок постов с ограниченным расходом памяти.
+
+Файл пишется на диск частями по мере чтения запроса. Файл больше
+settings.POST_IMAGE_MAX_SIZE не дописывается, у картинки больше
+settings.POST_IMAGE_MAX_PIXELS пикселей (проверка по заголовку, без
+декодирования) файл удаляется сразу; в обоих случаях форма получает
+RejectedUpload с текстом ошибки. У JPEG метаданные (EXIF, XMP, IPTC,
+комментарии) вырезаются потоково, без перекодирования, а ориентация
+кадра сохраняется.
+
+Обработчик включается только у view форм поста декоратором
+image_uploads, остальные загрузки идут обработчиками по умолчанию.
+"""
+import struct
+import tempfile
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile, UploadedFile
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+CHUNK_SIZE = 64 * 1024
+ORIENTATION = 0x0112
+
+SOI, SOS = b'\xff\xd8', 0xDA
+APP0, APP1, APP13, COM = 0xE0, 0xE1, 0xED, 0xFE
+# сегменты с метаданными: EXIF и XMP, IPTC (Photoshop), комментарии
+METADATA_SEGMENTS = {APP1, APP13, COM}
+
+
+class RejectedUpload(SimpleUploadedFile):
+    """Отклонённый при загрузке файл: содержимого нет, есть причина."""
+
+    def __init__(self, name, content_type, size, error):
+        super().__init__(name, b'', content_type)
+        self.size = size
+        self.error = error
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет файлы на диск частями, обрывает слишком большие и отклоняет
+    картинки со слишком большим числом пикселей.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.oversized:
+            return None
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            # дальше данные только отсчитываются, на диск не пишутся
+            self.oversized = True
+            self.file.close()
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.file_name:
+            raise SkipFile()
+        if self.oversized:
+            return self.reject('Файл больше %s.' % filesizeformat(
+                settings.POST_IMAGE_MAX_SIZE
+            ))
+        uploaded = super().file_complete(file_size)
+        try:
+            width, height = read_header(uploaded)[1]
+        except Image.DecompressionBombError:
+            # Pillow не открывает картинки во много раз больше своего
+            # MAX_IMAGE_PIXELS, размеры из такой картинки не получить
+            return self.reject_pixels(uploaded, 'Картинка')
+        except Exception:
+            # не картинка: об этом скажет проверка поля формы
+            return uploaded
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            return self.reject_pixels(uploaded, f'Картинка {width}×{height}')
+        return uploaded
+
+    def reject_pixels(self, uploaded, picture):
+        uploaded.close()
+        return self.reject(
+            f'{picture} слишком большая: допустимо '
+            f'не больше {settings.POST_IMAGE_MAX_PIXELS} пикселей.'
+        )
+
+    def reject(self, error):
+        return RejectedUpload(
+            self.file_name, self.content_type, self.received, error
+        )
+
+
+def image_uploads(view):
+    """
+    Включает ImageUploadHandler для запросов к view. Обработчики нельзя
+    менять после чтения request.POST, а CsrfViewMiddleware читает его
+    ещё до view, поэтому CSRF проверяется здесь, после их замены.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers.insert(0, ImageUploadHandler(request))
+        return protected(request, *args, **kwargs)
+    return wrapper
+
+
+def image_source(data):
+    """Путь к файлу на диске или сам файл, перемотанный в начало."""
+    if hasattr(data, 'temporary_file_path'):
+        return data.temporary_file_path()
+    data.seek(0)
+    return data
+
+
+def read_header(data):
+    """
+    Формат, размеры и ориентация картинки. Image.open читает только
+    заголовок, растр не декодируется.
+    """
+    with Image.open(image_source(data)) as image:
+        orientation = image.getexif().get(ORIENTATION, 1)
+        return image.format, image.size, orientation
+
+
+def strip_jpeg_metadata(data, orientation=1):
+    """
+    Копия JPEG без сегментов метаданных. Растр копируется как есть,
+    частями по CHUNK_SIZE; ориентация кадра переносится в новый
+    минимальный EXIF, чтобы картинка не «легла на бок».
+    """
+    result = UploadedFile(
+        tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR),
+        data.name, data.content_type, 0,
+    )
+    data.seek(0)
+    if data.read(2) != SOI:
+        raise ValueError('не JPEG')
+    write = result.write
+    write(SOI)
+    exif_pending = orientation != 1
+    for kind, segment in jpeg_segments(data):
+        if exif_pending and kind != APP0:
+            write(exif_segment(orientation))
+            exif_pending = False
+        if kind not in METADATA_SEGMENTS:
+            write(segment)
+    # после начала скана — сжатые данные до конца файла
+    for chunk in iter(lambda: data.read(CHUNK_SIZE), b''):
+        write(chunk)
+    result.size = result.tell()
+    result.seek(0)
+    return result
+
+
+def jpeg_segments(data):
+    """Сегменты JPEG до начала скана включительно: (тип, байты)."""
+    while True:
+        marker = read_exactly(data, 2)
+        if marker[0] != 0xFF:
+            raise ValueError('повреждённый JPEG')
+        kind = marker[1]
+        while kind == 0xFF:
+            # байты-заполнители перед маркером
+            kind = read_exactly(data, 1)[0]
+        length = read_exactly(data, 2)
+        size = struct.unpack('>H', length)[0]
+        if size < 2:
+            raise ValueError('повреждённый JPEG')
+        yield kind, bytes((0xFF, kind)) + length + read_exactly(
+            data, size - 2
+        )
+        if kind == SOS:
+            return
+
+
+def read_exactly(data, size):
+    # обрезанный файл кончается посреди заголовков сегментов
+    chunk = data.read(size)
+    if len(chunk) < size:
+        raise ValueError('повреждённый JPEG')
+    return chunk
+
+
+def exif_segment(orientation):
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    payload = exif.tobytes()
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
@@ -11,6 +11,9 @@ urlpatterns = [
          name="add_comment"),
     path("group/<slug:slug>/", views.group_posts, name="group_posts"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search_posts, name="search"),
+    path("tag/<str:tag>/", views.tag_posts, name="tag_posts"),
+    path("mentions/", views.mentions, name="mentions"),
     path("<str:username>/", views.profile, name="profile"),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
     path("<str:username>/follow/", views.profile_follow,
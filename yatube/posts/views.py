@@ -1,64 +1,106 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
 
+from . import counters, feed, links, search, thumbnails, uploads
+from .cache import cache_page_versioned, forget_card, scoped_etag
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Group, Post, Tag, User
+from .paginator import CursorPaginator
 
+POSTS_PER_PAGE = 10
+# страницы сбрасываются сигналами при изменениях, таймаут — страховка
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6
 
-@cache_page(timeout=20, key_prefix='index_page')
+
+def paginate(request, posts, **kwargs):
+    paginator = CursorPaginator(posts, POSTS_PER_PAGE, **kwargs)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, 'index_page')
 def index(request):
-    latest = Post.objects.all()
-    paginator = Paginator(latest, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    latest = Post.objects.for_list()
+    page = paginate(request, latest, count_key='index_count')
     return render(request, 'index.html', {'page': page})
 
 
+def group_exists(request, slug):
+    return Group.objects.filter(slug=slug).exists()
+
+
+def author_exists(request, username):
+    return User.objects.filter(username=username).exists()
+
+
+# повторный визит без изменений получает 304 до поиска страницы в кеше
+@condition(etag_func=scoped_etag('group:{slug}', per_user=True,
+                                 exists=group_exists))
+@cache_page_versioned(PAGE_CACHE_TIMEOUT, 'group_page', ('group:{slug}',))
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    posts = group.posts.for_list()
+    page = paginate(request, posts, count_key=f'group_count:{group.pk}')
     return render(request, 'group.html', {'group': group, 'page': page})
 
 
+@condition(etag_func=scoped_etag('author:{username}', per_user=True,
+                                 exists=author_exists))
+@cache_page_versioned(
+    PAGE_CACHE_TIMEOUT, 'profile_page', ('author:{username}',)
+)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    count_post = author.posts.count()
-    post = author.posts.all()
-    paginator = Paginator(post, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = counters.stats_for(author)
+    post = author.posts.for_list()
+    page = paginate(request, post)
     following = None
     if request.user.is_authenticated:
         following = author.following.filter(user=request.user).exists()
     return render(request, 'profile.html', {'author': author,
-                                            'count': count_post,
+                                            'stats': stats,
+                                            'count': stats.posts_count,
                                             'page': page,
                                             'following': following})
 
 
+def post_version(request, username, post_id):
+    return Post.objects.filter(
+        pk=post_id, author__username=username
+    ).values_list('version', flat=True).first()
+
+
+# версия поста меняется при правке и комментариях, поколение автора —
+# при изменении его счётчиков на странице
+@condition(etag_func=scoped_etag('author:{username}', per_user=True,
+                                 extra=post_version))
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.for_list().select_related('author__stats'),
+        id=post_id, author__username=username
+    )
     comments = post.comments.select_related('author')
     form = CommentForm()
     author = post.author
-    count_post = author.posts.count()
+    stats = counters.stats_for(author)
     following = None
     if request.user.is_authenticated:
         following = author.following.filter(user=request.user).exists()
     return render(request, 'post.html', {'post': post,
                                          'author': author,
-                                         'count': count_post,
+                                         'stats': stats,
+                                         'count': stats.posts_count,
                                          'comments': comments,
                                          'form': form,
                                          'following': following})
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
     author = post.author
@@ -68,20 +110,25 @@ def add_comment(request, username, post_id):
         new_comment.post = post
         new_comment.author = request.user
         new_comment.save()
+        forget_card(post)
     return redirect('post', username=author, post_id=post_id)
 
 
+@uploads.image_uploads
 @login_required
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         new = form.save(commit=False)
         new.author = request.user
         new.save()
+        thumbnails.schedule(new)
         return redirect('index')
     return render(request, 'new.html', {'form': form})
 
 
+@uploads.image_uploads
 @login_required
 def post_edit(request, username, post_id):
     post = get_object_or_404(Post, id=post_id, author__username=username)
@@ -90,7 +137,10 @@ def post_edit(request, username, post_id):
         request.POST or None, files=request.FILES or None, instance=post
     )
     if form.is_valid():
+        forget_card(post)
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('post', username=request.user, post_id=post_id)
     if author == request.user:
         return render(request, 'edit.html', {'form': form,
@@ -99,18 +149,43 @@ def post_edit(request, username, post_id):
     return redirect('index')
 
 
+def tag_posts(request, tag):
+    tag = get_object_or_404(Tag, name=tag.lower())
+    posts = links.tagged(tag).for_list()
+    page = paginate(request, posts, date_field='tag_date')
+    return render(request, 'tag.html', {'tag': tag, 'page': page})
+
+
+@login_required
+def mentions(request):
+    posts = links.mentioning(request.user).for_list()
+    page = paginate(request, posts, date_field='mention_date')
+    return render(request, 'mentions.html', {'page': page})
+
+
+def search_posts(request):
+    query = request.GET.get('q', '').strip()
+    page = None
+    if query:
+        # порядок задаёт релевантность, поэтому пагинация обычная
+        paginator = Paginator(search.ranked_post_ids(query), POSTS_PER_PAGE)
+        page = paginator.get_page(request.GET.get('page'))
+        posts = Post.objects.for_list().in_bulk(page.object_list)
+        page.object_list = [posts[pk] for pk in page.object_list
+                            if pk in posts]
+        search.add_snippets(page.object_list, query)
+    return render(request, 'search.html', {'query': query, 'page': page})
+
+
 @login_required
 def follow_index(request):
-    post = Post.objects.filter(author__following__user=request.user)
-    count_post = post.count()
-    paginator = Paginator(post, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, "follow.html", {'count': count_post,
-                                           'page': page})
+    post = feed.for_user(request.user).for_list()
+    page = paginate(request, post, date_field='feed_date')
+    return render(request, "follow.html", {'page': page})
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user == author:
@@ -120,6 +195,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,55 @@
+"""
+Прогрев шаблонов при запуске процесса.
+
+Кешированный загрузчик читает и разбирает шаблон при первом выводе,
+то есть за счёт первого запроса к странице. warm_templates() загружает
+все шаблоны проекта заранее, из PostsConfig.ready().
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+
+def template_dirs(engine):
+    """Каталоги шаблонов проекта: DIRS и templates/ приложений проекта."""
+    project = os.path.join(settings.BASE_DIR, '')
+    apps = [path for path in get_app_template_dirs('templates')
+            if path.startswith(project)]
+    return list(engine.dirs) + apps
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.endswith('.html'):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates(engine=None):
+    """
+    Загружает шаблоны проекта через загрузчики engine (по умолчанию —
+    движок Django из settings.TEMPLATES). Возвращает число шаблонов.
+    """
+    engine = engine or engines['django'].engine
+    start = time.perf_counter()
+    count = 0
+    for directory in template_dirs(engine):
+        for name in template_names(directory):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                # ошибка всё равно проявится при выводе шаблона,
+                # запуск процесса из-за неё не прерывается
+                logger.exception('Шаблон %s не разобран', name)
+                continue
+            count += 1
+    logger.info('Шаблонов разобрано: %d за %.1f ms',
+                count, (time.perf_counter() - start) * 1000)
+    return count
@@ -0,0 +1,378 @@
+"""
+Кеш для нескольких процессов (воркеров gunicorn).
+
+SQLiteCache — общий для процессов кеш в файле SQLite.
+TwoTierCache — небольшой LRU-кеш в памяти процесса перед общим кешем
+(SQLiteCache, FileBasedCache, Redis — любой кеш из settings.CACHES).
+Изменения ключей записываются в журнал в общем кеше; остальные
+процессы читают журнал не чаще раза в SYNC_INTERVAL секунд и убирают
+изменённые ключи из своей памяти. Числа (счётчики, поколения кеша
+страниц) в памяти процесса не хранятся: их меняет incr, и журнал
+для каждого incr удвоил бы запись в общий кеш.
+"""
+import numbers
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite; LOCATION — путь к файлу."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    # просроченные и лишние записи удаляются не чаще раза в минуту
+    cull_interval = 60
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._culled_at = time.monotonic()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)'
+            )
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        row = self._db.execute(
+            'SELECT value FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        if not made:
+            return {}
+        rows = self._db.execute(
+            'SELECT key, value FROM cache WHERE key IN (%s) '
+            'AND (expires IS NULL OR expires > ?)' % ','.join('?' * len(made)),
+            (*made, time.time()),
+        )
+        return {made[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, self.pickle_protocol),
+             self._expires(timeout)),
+        )
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        db = self._db
+        with self._transaction(db):
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()),
+            )
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, self.pickle_protocol),
+                 self._expires(timeout)),
+            ).rowcount
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        return bool(self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (self._expires(timeout), key, time.time()),
+        ).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        made = self.make_key(key, version=version)
+        self.validate_key(made)
+        db = self._db
+        with self._transaction(db):
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)', (made, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), made),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self._db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _transaction(self, db):
+        return _Immediate(db)
+
+    def _maybe_cull(self):
+        now = time.monotonic()
+        if now - self._culled_at < self.cull_interval:
+            return
+        self._culled_at = now
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        # ключи без срока (поколения, счётчики, журнал TwoTierCache)
+        # не вытесняются: MAX_ENTRIES ограничивает записи со сроком
+        count = db.execute(
+            'SELECT COUNT(*) FROM cache WHERE expires IS NOT NULL'
+        ).fetchone()[0]
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'WHERE expires IS NOT NULL ORDER BY expires LIMIT ?)',
+                (count - self._max_entries,)
+            )
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE: запись блокирует другие процессы до COMMIT."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+def shared_only(value):
+    """Числа читаются только из общего кеша, см. TwoTierCache.incr."""
+    return isinstance(value, numbers.Number)
+
+
+class TwoTierCache(BaseCache):
+    """
+    LOCATION — имя общего кеша в settings.CACHES. OPTIONS:
+    LOCAL_MAX_ENTRIES (1000), LOCAL_TIMEOUT (60 с) и SYNC_INTERVAL (1 с).
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    journal_timeout = 300
+    journal_limit = 1000
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._sync_interval = options.get('SYNC_INTERVAL', 1)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._synced_at = 0
+        self._seen = None
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # локальный уровень
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return MISSING
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._local[key]
+                return MISSING
+            self._local.move_to_end(key)
+        return pickle.loads(value)
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if shared_only(value):
+            return
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is not None and timeout <= 0:
+            self._local_delete(key)
+            return
+        if timeout is None or timeout > self._local_timeout:
+            timeout = self._local_timeout
+        value = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._local[key] = (value, time.time() + timeout)
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    # журнал изменений для других процессов
+
+    def _journal_seq_key(self):
+        return f'{self.key_prefix}:l1:seq'
+
+    def _publish(self, *keys):
+        seq_key = self._journal_seq_key()
+        try:
+            seq = self.shared.incr(seq_key)
+        except ValueError:
+            self.shared.add(seq_key, 0, None)
+            seq = self.shared.incr(seq_key)
+        self.shared.set(
+            f'{self.key_prefix}:l1:{seq}', keys, self.journal_timeout
+        )
+        if self._seen is not None and self._seen == seq - 1:
+            self._seen = seq
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = now
+        seq = self.shared.get(self._journal_seq_key(), 0)
+        seen, self._seen = self._seen, seq
+        if seen is None or seen == seq:
+            return
+        if seq < seen or seq - seen > self.journal_limit:
+            with self._lock:
+                self._local.clear()
+            return
+        entries = self.shared.get_many(
+            [f'{self.key_prefix}:l1:{n}' for n in range(seen + 1, seq + 1)]
+        )
+        if len(entries) < seq - seen:
+            with self._lock:
+                self._local.clear()
+            return
+        with self._lock:
+            for keys in entries.values():
+                for key in keys:
+                    self._local.pop(key, None)
+
+    # интерфейс кеша Django
+
+    def get(self, key, default=None, version=None):
+        made = self.make_key(key, version=version)
+        self._sync()
+        value = self._local_get(made)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version=self._version(version))
+        if value is MISSING:
+            return default
+        self._local_set(made, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found, missing = {}, []
+        for key in keys:
+            value = self._local_get(self.make_key(key, version=version))
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(
+                missing, version=self._version(version)
+            )
+            for key, value in shared.items():
+                self._local_set(self.make_key(key, version=version), value)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made = self.make_key(key, version=version)
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout, version=self._version(version))
+        self._local_set(made, value, timeout)
+        self._publish(made)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        added = self.shared.add(
+            key, value, timeout, version=self._version(version)
+        )
+        if added:
+            self._local_set(self.make_key(key, version=version), value,
+                            timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(
+            key, self._timeout(timeout), version=self._version(version)
+        )
+
+    def incr(self, key, delta=1, version=None):
+        made = self.make_key(key, version=version)
+        value = self.shared.incr(key, delta, version=self._version(version))
+        # числа в памяти процессов не хранятся, журнал не нужен
+        self._local_delete(made)
+        return value
+
+    def delete(self, key, version=None):
+        made = self.make_key(key, version=version)
+        self.shared.delete(key, version=self._version(version))
+        self._local_delete(made)
+        self._publish(made)
+
+    def delete_many(self, keys, version=None):
+        made = [self.make_key(key, version=version) for key in keys]
+        self.shared.delete_many(keys, version=self._version(version))
+        for key in made:
+            self._local_delete(key)
+        self._publish(*made)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._local.clear()
+        self._seen = None
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout == DEFAULT_TIMEOUT else timeout
+
+    def _version(self, version):
+        return self.version if version is None else version
@@ -12,28 +12,74 @@ DEBUG = os.getenv('DEBUG')
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# SHARED_CACHE: locmem (по умолчанию), sqlite, file или redis.
+# Общий кеш видят все воркеры; перед ним в каждом процессе
+# стоит небольшой LRU-кеш (yatube.cache.TwoTierCache).
+SHARED_CACHE = os.getenv('SHARED_CACHE', 'locmem')
+
+SHARED_CACHE_BACKENDS = {
+    'sqlite': {
+        'BACKEND': 'yatube.cache.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        # страницы, карточки и журнал TwoTierCache; 300 по умолчанию мало
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
 }
 
+if SHARED_CACHE == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 60,
+                'SYNC_INTERVAL': 1,
+            },
+        },
+        'shared': SHARED_CACHE_BACKENDS[SHARED_CACHE],
+    }
+
+# Счётчики кеша страниц (cache_stats) копятся в каждом процессе
+# и переносятся в общий кеш раз в METRICS_FLUSH_INTERVAL секунд.
+METRICS_FLUSH_INTERVAL = 10
+
 
 INSTALLED_APPS = [
-    'posts',
+    'posts.apps.PostsConfig',
     'users',
     'about',
+    'api',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'sorl.thumbnail',
 #    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'posts.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,12 +97,28 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+# Без DEBUG шаблоны читаются и разбираются один раз на процесс
+# (кешированный загрузчик), с DEBUG — при каждом выводе, чтобы правки
+# были видны сразу.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+# Шаблоны проекта разбираются заранее, при запуске процесса
+# (posts.warmup), чтобы первые запросы после деплоя не тратили на это время.
+TEMPLATES_WARMUP = os.getenv('TEMPLATES_WARMUP', '0' if DEBUG else '1') == '1'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # шаблоны Django с замером времени отрисовки для профилирования
+        'BACKEND': 'posts.profiling.DjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -129,3 +191,65 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Feed
+# Посты автора раскладываются по лентам подписчиков, пока подписчиков
+# не больше FEED_FANOUT_LIMIT; при подписке в ленту добавляются
+# последние FEED_BACKFILL_LIMIT постов автора.
+
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_LIMIT = 1000
+
+# Thumbnails
+# Копии картинок постов создаются в фоновых потоках: для каждой
+# ширины из IMAGE_DERIVATIVE_WIDTHS в каждом формате; последний
+# формат — запасной для браузеров без поддержки остальных.
+
+THUMBNAIL_WORKERS = 2
+IMAGE_DERIVATIVE_WIDTHS = (360, 540, 720, 960)
+IMAGE_DERIVATIVE_FORMATS = ('webp', 'jpeg')
+IMAGE_DERIVATIVE_QUALITY = 80
+
+# Uploads
+# Формы поста (posts.uploads.image_uploads) пишут загружаемые файлы сразу
+# на диск частями, без буфера в памяти. Картинки постов больше
+# POST_IMAGE_MAX_SIZE байт или POST_IMAGE_MAX_PIXELS пикселей
+# отклоняются по заголовку.
+
+POST_IMAGE_MAX_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+
+# Search
+# Поисковый индекс обновляется вместе с записью поста или комментария.
+# При SEARCH_INDEX_DEFERRED запись только отмечается в журнале, а индекс
+# обновляет python manage.py reindex_search --incremental (по расписанию).
+
+SEARCH_INDEX_DEFERRED = os.getenv('SEARCH_INDEX_DEFERRED', '') == '1'
+
+# Post cards
+# Списки постов выводят карточки тегом {% post_cards %}: готовые карточки
+# читаются из кеша одним запросом, недостающие рендерятся скомпилированным
+# шаблоном. Без POST_CARDS_BATCHED тег подключает includes/post_item.html
+# для каждого поста, как {% include %} в цикле.
+POST_CARDS_BATCHED = os.getenv('POST_CARDS_BATCHED', '1') == '1'
+
+# Profiling
+# Доля запросов (от 0 до 1), для которых posts.profiling.ProfilingMiddleware
+# пишет в лог posts.profiling и в заголовок Server-Timing число и время
+# SQL-запросов, время отрисовки и попадания в кеш.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'posts.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}